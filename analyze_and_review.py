@@ -0,0 +1,19 @@
+from modules.cli import get_parser, parse_arguments, process_games
+from modules.pipeline import Pipeline
+
+if __name__ == "__main__":
+    parser = get_parser(
+        "ChessTacticFinder",
+        "A tool for finding tactics out of PGN files and reviewing the games in one go.",
+        analysis=True,
+    )
+    args = parse_arguments(parser)
+    process_games(
+        Pipeline,
+        args,
+        "Analysis and review",
+        "Analyzed and reviewed",
+        {"triage": args.triage},
+        # shared plies are not recorded by games, so replayed games search them separately
+        share_openings=args.share_openings and not args.replay,
+    )
@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import platform
+import time
+from dataclasses import fields
+from typing import Optional
+
+from modules.configuration import load_configuration
+from modules.converter import index_games
+from modules.finder.analyzer import Analyzer
+from modules.json import json_load, json_save
+from modules.reviewer.reviewer import Reviewer
+from modules.server.client import DummyClient
+from modules.structures.message_sender import MessageSender
+from modules.structures.statistics import Statistics
+from modules.structures.tactic import Tactic
+
+configuration = load_configuration()
+
+STOCKFISH_PATH = configuration["paths"]["stockfish"]
+STOCKFISH_DEPTH = configuration["stockfish"]["depth"]
+STOCKFISH_MOVETIME = configuration["stockfish"]["movetime"]
+STOCKFISH_NODES = configuration["stockfish"]["nodes"]
+TRIAGE = configuration["analysis"]["triage"]
+DEEPENING = configuration["analysis"]["deepening"]
+DEEPENING_DEPTHS = configuration["analysis"]["deepening_depths"]
+
+CORPUS_PATH = os.path.join("benchmark", "corpus.pgn")
+GOLDEN_PATH = os.path.join("benchmark", "golden.json")
+
+
+def get_tactic_key(tactic: Tactic) -> str:
+    return f"{tactic[0].fen} {' '.join(position.move for position in tactic)}"
+
+
+def run_game(index: int, pgn_path: str, stockfish_depth: int, triage: bool, deepening: bool, review: bool) -> dict:
+    message_sender = MessageSender(client=DummyClient(), id="benchmark", text="Benchmarked")
+    analyzer = Analyzer(
+        index,
+        message_sender,
+        triage=triage,
+        pgn_path=pgn_path,
+        cache=False,
+        deepening_depths=DEEPENING_DEPTHS if deepening else [],
+    )
+    moves, game = analyzer.load_game("")
+    headers = game.headers
+    name = f"{headers.get('White', '_')} vs {headers.get('Black', '_')} ({headers.get('Date', '___')})"
+    print(f"Benchmarking: {name}")
+
+    _, tactics = analyzer.find_variations(
+        moves=moves,
+        starting_position=headers.get("FEN"),
+        headers=headers,
+        output_filename=name,
+        stockfish_depth=stockfish_depth,
+    )
+    result = {
+        "game": name,
+        "plies": len(moves),
+        "analysis": analyzer.statistics.to_json(),
+        "tactics": {get_tactic_key(tactic): tactic.type for tactic in tactics},
+    }
+
+    if review:
+        reviewer = Reviewer(index, message_sender, pgn_path=pgn_path, cache=False)
+        try:
+            reviewed = reviewer.review_game(
+                moves=moves,
+                starting_position=headers.get("FEN"),
+                headers=headers,
+                output_filename=name,
+                stockfish_depth=stockfish_depth,
+            )
+        except ValueError as error:
+            print(f"Stockfish error: {error}")
+            result["error"] = str(error)
+            return result
+
+        result["review"] = reviewer.statistics.to_json()
+        result["classifications"] = [move.move_classification.type for move in reviewed.moves]
+
+    return result
+
+
+def get_totals(games: list[dict], phase: str) -> Optional[dict]:
+    games = [game for game in games if phase in game]
+    if not games:
+        return None
+
+    statistics = Statistics()
+    for game in games:
+        for name, seconds in game[phase]["phases"].items():
+            statistics.add_phase(name, seconds)
+
+        for counter in fields(Statistics):
+            if counter.name != "phases":
+                setattr(statistics, counter.name, getattr(statistics, counter.name) + game[phase][counter.name])
+
+    return statistics.to_json()
+
+
+def compare(games: list[dict], golden: dict) -> dict:
+    """
+    Differences of found tactics and review classifications against the golden result, keyed by game names.
+    """
+    golden_games = {game["game"]: game for game in golden["games"]}
+    differences = {}
+    for game in games:
+        expected = golden_games.get(game["game"])
+        if expected is None:
+            differences[game["game"]] = {"missing_game": True}
+            continue
+
+        difference = {
+            "missing_tactics": sorted(set(expected["tactics"]) - set(game["tactics"])),
+            "extra_tactics": sorted(set(game["tactics"]) - set(expected["tactics"])),
+            "changed_types": sorted(
+                key
+                for key in set(game["tactics"]) & set(expected["tactics"])
+                if game["tactics"][key] != expected["tactics"][key]
+            ),
+        }
+        if "classifications" in game and "classifications" in expected:
+            difference["changed_classifications"] = [
+                ply
+                for ply, (actual, wanted) in enumerate(zip(game["classifications"], expected["classifications"]))
+                if actual != wanted
+            ]
+
+        if any(difference.values()):
+            differences[game["game"]] = difference
+
+    return differences
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="ChessTacticFinder",
+        description="A benchmark of the analysis and the review over a pinned corpus of games.",
+    )
+
+    parser.add_argument("--corpus", type=str, help="Path to the PGN corpus", default=CORPUS_PATH)
+    parser.add_argument("--golden", type=str, help="Path to the golden result", default=GOLDEN_PATH)
+    parser.add_argument("--output", "-o", type=str, help="Path to the JSON report, printed if not given")
+    parser.add_argument("--depth", "-d", type=int, help="Stockfish depth", default=STOCKFISH_DEPTH)
+    parser.add_argument(
+        "--triage",
+        action=argparse.BooleanOptionalAction,
+        help="Search only plies with a significant evaluation swing found by a shallow scan",
+        default=TRIAGE,
+    )
+    parser.add_argument(
+        "--deepening",
+        action=argparse.BooleanOptionalAction,
+        help="Reject positions of tactic trees at the lower depths of iterative deepening",
+        default=DEEPENING,
+    )
+    parser.add_argument("--review", action=argparse.BooleanOptionalAction, help="Review the games", default=True)
+    parser.add_argument("--update-golden", action="store_true", help="Save the result as the new golden result")
+    args = parser.parse_args()
+
+    _, indices = index_games(args.corpus, None)
+
+    start = time.perf_counter()
+    games = [run_game(index, args.corpus, args.depth, args.triage, args.deepening, args.review) for index in indices]
+
+    report = {
+        "corpus": args.corpus,
+        "engine": {
+            "path": STOCKFISH_PATH,
+            "depth": args.depth,
+            "movetime": STOCKFISH_MOVETIME,
+            "nodes": STOCKFISH_NODES,
+            "triage": args.triage,
+            "deepening": DEEPENING_DEPTHS if args.deepening else [],
+        },
+        "platform": platform.platform(),
+        "time": time.perf_counter() - start,
+        "analysis": get_totals(games, "analysis"),
+        "review": get_totals(games, "review"),
+        "games": games,
+    }
+
+    if args.update_golden:
+        json_save({"engine": report["engine"], "games": games}, args.golden)
+        print(f"Saved the golden result to {args.golden}.")
+    elif os.path.exists(args.golden):
+        golden = json_load(args.golden)
+        if golden["engine"] != report["engine"]:
+            print("The golden result was saved with different engine settings.")
+
+        report["differences"] = compare(games, golden)
+    else:
+        print(f"No golden result at {args.golden}, run with --update-golden to save one.")
+
+    if args.output:
+        json_save(report, args.output)
+        print(f"Saved the report to {args.output}.")
+    else:
+        print(json.dumps(report, indent=4))
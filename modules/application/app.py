@@ -1,10 +1,16 @@
+import asyncio
+import json
 import logging
 import os
+import re
 import sqlite3
+import threading
+import time
 import urllib.parse
 import webbrowser
+from typing import Optional
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.responses import (
     FileResponse,
     JSONResponse,
@@ -12,33 +18,46 @@ from fastapi.responses import (
     StreamingResponse,
 )
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.responses import HTMLResponse
 
 from modules.application import DEFAULT_ERROR_MESSAGE
-from modules.application.run import run_script
+from modules.application.chart import chart_cache
 from modules.application.stream import create_process, get_install_path, stream_output
 from modules.configuration import load_configuration, save_configuration
 from modules.endgame import ENDGAME_LAYOUTS, WINNING_SIDES_RANGES
-from modules.json import json_load
+from modules.metrics import metrics
 from modules.requests.configuration import Configuration
 from modules.requests.move import MoveData
-from modules.server.auxiliary import refresh
+from modules.requests.puzzles import ProgressData, get_puzzle_filters
+from modules.server.auxiliary import (
+    clear_progress,
+    import_progress,
+    load_progress,
+    puzzle_index,
+    refresh,
+    update_progress,
+)
 from modules.server.endgame import EndgameStudySingleton
+from modules.server.puzzle_index import PAGE_SIZE, PuzzleFilters
+from modules.server.scheduler import BULK_PRIORITY, INTERACTIVE_PRIORITY, Scheduler
 from modules.server.status_server import StatusServer
-from modules.structures.review import Review
 
 configuration = load_configuration()
-INPUT_PGN_FILE = configuration["paths"]["input_pgn"]
 LOG_FILE = configuration["paths"]["log"]
 PORT = configuration["server"]["port"]
 OPEN_BROWSER = configuration["server"]["open_browser"]
 LOG_LEVEL = configuration["server"]["log_level"]
+STATUS_INTERVAL = configuration["server"]["status_interval"]
+STATUS_STREAM_LIFETIME = 10
+STATUS_STREAM_RETRY = 500
 
 logger = logging.getLogger("uvicorn.error")
 
 app = FastAPI()
 status_server = StatusServer()
+scheduler = Scheduler()
 
 
 @app.exception_handler(StarletteHTTPException)
@@ -61,13 +80,17 @@ async def favicon():
 @app.on_event("startup")
 async def startup_event():
     status_server.start()
-    await refresh_endpoint(True)
+    scheduler.start()
+    await run_in_threadpool(import_progress, logger.info)
+    # the server is ready at once, puzzles and reviews are gathered in the background
+    threading.Thread(target=refresh, args=(logger.info, True), daemon=True).start()
     if OPEN_BROWSER:
         webbrowser.open(f"http://localhost:{PORT}/index.html")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    scheduler.stop()
     status_server.stop()
 
 
@@ -78,10 +101,57 @@ async def get_configuration():
 
 @app.get("/refresh")
 async def refresh_endpoint(gather: bool = False):
-    refresh(logger.info, gather_games=gather)
+    await run_in_threadpool(refresh, logger.info, gather)
     return PlainTextResponse("Refreshed.")
 
 
+@app.get("/puzzles")
+async def get_puzzles(
+    filters: PuzzleFilters = Depends(get_puzzle_filters),
+    after: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+):
+    page = await run_in_threadpool(puzzle_index.query, filters, after, limit)
+    return JSONResponse(page)
+
+
+@app.get("/puzzles/random")
+async def get_random_puzzle(filters: PuzzleFilters = Depends(get_puzzle_filters)):
+    puzzle = await run_in_threadpool(puzzle_index.get_random, filters)
+    if puzzle is None:
+        raise HTTPException(status_code=404, detail="No puzzle matches the filters")
+    return JSONResponse(puzzle)
+
+
+@app.get("/puzzles/statistics")
+async def get_puzzle_statistics():
+    return JSONResponse(await run_in_threadpool(puzzle_index.get_statistics))
+
+
+@app.get("/puzzles/{puzzle_hash}")
+async def get_puzzle(puzzle_hash: str):
+    puzzle = await run_in_threadpool(puzzle_index.get, puzzle_hash)
+    if puzzle is None:
+        raise HTTPException(status_code=404, detail="Puzzle not found")
+    return JSONResponse(puzzle)
+
+
+@app.get("/progress")
+async def get_progress():
+    return JSONResponse(await run_in_threadpool(load_progress))
+
+
+@app.post("/progress")
+async def save_progress_endpoint(data: ProgressData):
+    return JSONResponse(await run_in_threadpool(update_progress, data.values, logger.info))
+
+
+@app.delete("/progress")
+async def clear_progress_endpoint():
+    await run_in_threadpool(clear_progress, logger.info)
+    return PlainTextResponse("Progress cleared.")
+
+
 @app.get("/analysis_state")
 async def analysis_state():
     try:
@@ -92,6 +162,33 @@ async def analysis_state():
     return JSONResponse(dictionary)
 
 
+@app.get("/analysis_states")
+async def analysis_states():
+    return JSONResponse(status_server.get_jobs())
+
+
+@app.get("/analysis_state/stream")
+async def analysis_state_stream(request: Request):
+    async def generate_states():
+        # states of all jobs are pushed at most once per interval, and only when any of them has changed
+        # the stream is renewed by the browser from time to time, so that it does not keep the server from shutting down
+        version = None
+        deadline = time.monotonic() + STATUS_STREAM_LIFETIME
+        yield f"retry: {STATUS_STREAM_RETRY}\n\n"
+        while status_server.running and time.monotonic() < deadline and not await request.is_disconnected():
+            if status_server.version != version:
+                version = status_server.version
+                yield f"data: {json.dumps(status_server.get_jobs())}\n\n"
+            await asyncio.sleep(STATUS_INTERVAL)
+
+    return StreamingResponse(generate_states(), media_type="text/event-stream")
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.to_prometheus())
+
+
 @app.get("/reinstall")
 async def reinstall():
     async def generate_output():
@@ -105,23 +202,64 @@ async def reinstall():
 
 
 @app.post("/analyze")
-async def analyze(request: Request):
-    return await analyze_mode(request, "analyze")
+async def analyze(request: Request, priority: Optional[int] = None):
+    return await analyze_mode(request, "analyze", priority)
 
 
 @app.post("/review")
-async def review_endpoint(request: Request):
-    return await analyze_mode(request, "review")
+async def review_endpoint(request: Request, priority: Optional[int] = None):
+    return await analyze_mode(request, "review", priority)
+
+
+@app.post("/analyze_and_review")
+async def analyze_and_review(request: Request, priority: Optional[int] = None):
+    return await analyze_mode(request, "analyze_and_review", priority)
+
+
+@app.get("/jobs")
+async def get_jobs(state: Optional[list[str]] = Query(None)):
+    return JSONResponse(await run_in_threadpool(scheduler.get_jobs, state))
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int):
+    return JSONResponse(get_job_or_404(await run_in_threadpool(scheduler.get_job, job_id)))
+
+
+@app.get("/jobs/{job_id}/log")
+async def get_job_log(job_id: int):
+    get_job_or_404(await run_in_threadpool(scheduler.get_job, job_id))
+    path = scheduler.get_log_path(job_id)
+    if not os.path.exists(path):
+        return PlainTextResponse("")
+    return FileResponse(path, media_type="text/plain")
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: int):
+    return JSONResponse(get_job_or_404(await run_in_threadpool(scheduler.cancel, job_id)))
+
+
+@app.post("/jobs/{job_id}/pause")
+async def pause_job(job_id: int):
+    try:
+        job = await run_in_threadpool(scheduler.pause, job_id)
+    except ValueError as error:
+        raise HTTPException(status_code=409, detail=str(error))
+    return JSONResponse(get_job_or_404(job))
+
+
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: int):
+    return JSONResponse(get_job_or_404(await run_in_threadpool(scheduler.resume, job_id)))
 
 
 @app.post("/reviewer/get_chart")
 async def get_chart(request: Request):
     data = await request.body()
     path = data.decode("utf-8")[1:]
-    dictionary = json_load(path)
-    review = Review.from_json(dictionary)
-    graph_data = review.plot_evaluations()
-    return PlainTextResponse(graph_data)
+    chart = await run_in_threadpool(chart_cache.get_chart, path)
+    return PlainTextResponse(chart)
 
 
 @app.post("/save_configuration")
@@ -196,20 +334,29 @@ async def endgame_generate(request: Request):
     if layout is None:
         raise HTTPException(status_code=400, detail="No layout provided")
 
-    run_script("endgame", layout)
-    return PlainTextResponse("Generation started.")
+    await run_in_threadpool(scheduler.submit, "endgame", layout, BULK_PRIORITY)
+    return PlainTextResponse("Generation queued.")
 
 
-async def analyze_mode(request: Request, mode: str):
-    logger.info("Analyzing...")
-    pgn = await request.body()
+def get_job_or_404(job: Optional[dict]) -> dict:
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 
-    input_pgn_file = os.path.normpath(INPUT_PGN_FILE)
-    with open(INPUT_PGN_FILE, "w") as file:
-        file.write(pgn.decode("utf-8"))
+def get_priority(pgn: str) -> int:
+    # a single game is reviewed interactively, so it is not kept waiting by imports of many games
+    games = len(re.findall(r"^\[Event ", pgn, re.MULTILINE))
+    return INTERACTIVE_PRIORITY if games <= 1 else BULK_PRIORITY
 
-    run_script(mode, input_pgn_file)
-    return PlainTextResponse("Analysis started.")
+
+async def analyze_mode(request: Request, mode: str, priority: Optional[int] = None):
+    logger.info("Analyzing...")
+    pgn = (await request.body()).decode("utf-8")
+    priority = get_priority(pgn) if priority is None else priority
+    job = await run_in_threadpool(scheduler.submit, mode, "", priority, pgn)
+    logger.info(f"Job {job['id']} queued.")
+    return PlainTextResponse("Analysis queued.")
 
 
 app.mount("/json", StaticFiles(directory="json", html=False), name="json")
@@ -0,0 +1,41 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from modules.structures.review import Review
+
+CHART_CACHE_SIZE = 64
+
+
+class ChartCache:
+    """
+    Charts of reviews keyed by the hash of the review file, so a chart is rendered again only if the review changes.
+    The least recently used charts are dropped above `size` entries.
+    """
+
+    def __init__(self, size: int = CHART_CACHE_SIZE):
+        self.size = size
+        self.charts: OrderedDict[str, str] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_chart(self, path: str) -> str:
+        with open(path, "rb") as file:
+            content = file.read()
+
+        key = hashlib.md5(content).hexdigest()
+        with self.lock:
+            if key in self.charts:
+                self.charts.move_to_end(key)
+                return self.charts[key]
+
+        chart = Review.from_json(json.loads(content)).plot_evaluations()
+        with self.lock:
+            self.charts[key] = chart
+            while len(self.charts) > self.size:
+                self.charts.popitem(last=False)
+
+        return chart
+
+
+chart_cache = ChartCache()
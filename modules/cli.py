@@ -0,0 +1,152 @@
+import argparse
+from typing import Optional, Type
+
+from tqdm import tqdm
+
+from modules.configuration import load_configuration
+from modules.converter import convert, index_games, parse_shard
+from modules.finder.opening_trie import build_opening_trie
+from modules.metrics import push_metrics
+from modules.pool import process_in_pool
+from modules.processor import Processor
+from modules.server.connection import get_client
+from modules.structures.message import Message
+from modules.structures.message_sender import MessageSender
+
+configuration = load_configuration()
+
+INPUT_DIRECTORY = configuration["paths"]["processed"]
+TACTICS_DIRECTORY = configuration["paths"]["tactics"]
+
+STOCKFISH_DEPTH = configuration["stockfish"]["depth"]
+STOCKFISH_JOBS = configuration["stockfish"]["jobs"]
+STOCKFISH_RECORD = configuration["stockfish"]["record"]
+TRIAGE = configuration["analysis"]["triage"]
+SHARE_OPENINGS = configuration["analysis"]["share_openings"]
+
+
+def get_parser(prog: str, description: str, analysis: bool = False) -> argparse.ArgumentParser:
+    """
+    Options of the scripts processing games of a PGN file. `analysis` adds the options of the tactic search.
+    """
+    parser = argparse.ArgumentParser(prog=prog, description=description)
+
+    parser.add_argument("pgn", type=str, nargs="?", help="Path to the PGN file.")
+    parser.add_argument("--depth", "-d", type=int, help="Stockfish depth", default=STOCKFISH_DEPTH)
+    parser.add_argument("--jobs", "-j", type=int, help="Number of parallel engines", default=STOCKFISH_JOBS)
+    if analysis:
+        parser.add_argument(
+            "--triage",
+            action=argparse.BooleanOptionalAction,
+            help="Search only plies with a significant evaluation swing found by a shallow scan",
+            default=TRIAGE,
+        )
+        parser.add_argument(
+            "--share-openings",
+            action=argparse.BooleanOptionalAction,
+            help="Search plies shared by several games of the batch once, before analyzing the games",
+            default=SHARE_OPENINGS,
+        )
+
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Read games directly from the PGN file through a byte-offset index instead of splitting it",
+    )
+    parser.add_argument(
+        "--shard", type=parse_shard, help="Process only the K-th of N parts of the indexed PGN file, as K/N"
+    )
+    parser.add_argument(
+        "--record",
+        action=argparse.BooleanOptionalAction,
+        help="Save results of engine searches with every game",
+        default=STOCKFISH_RECORD,
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Process already processed games again, searching only positions not found in their records",
+    )
+    return parser
+
+
+def parse_arguments(parser: argparse.ArgumentParser) -> argparse.Namespace:
+    args = parser.parse_args()
+    if args.shard and not args.index:
+        parser.error("--shard requires --index")
+    if args.index and not args.pgn:
+        parser.error("--index requires a PGN file")
+
+    return args
+
+
+def report(client, text: str, analyzed: int, total: int):
+    push_metrics(client)
+    client.send(Message(text, analyzed, total).encode())
+
+
+def process_games(
+    processor_class: Type[Processor],
+    args: argparse.Namespace,
+    title: str,
+    text: str,
+    options: Optional[dict] = None,
+    share_openings: bool = False,
+):
+    """
+    Process the games given by the options of `get_parser`, in a pool of `args.jobs` processes if there are more of
+    them. `title` names the processing in status messages, and `text` reports processed games, like "Analysis" and
+    "Analyzed". `options` are passed to every processor. With `share_openings`, plies shared by several games are
+    searched first, and passed to processors as `shared_plies`.
+    """
+    options = {
+        "pgn_path": args.pgn if args.index else None,
+        "record": args.record,
+        "replay": args.replay,
+        **(options or {}),
+    }
+    if args.index:
+        name, filenames = index_games(args.pgn, args.shard)
+    else:
+        name, filenames = convert(args.pgn)
+
+    total = len(filenames)
+    client = get_client()
+    client.send(Message(f"{name} {title} of {total} games started.", 0, total).encode())
+
+    analyzed = 0
+    try:
+        game_options = {}
+        if share_openings and total > 1:
+            trie = build_opening_trie(filenames, INPUT_DIRECTORY, TACTICS_DIRECTORY, options["pgn_path"])
+            trie.search(args.jobs, record=args.record)
+            game_options = {filename: {"shared_plies": trie.get_shared_plies(filename)} for filename in trie.games}
+
+        if args.jobs > 1 and total > 1:
+            message_sender = MessageSender(client=client, id=name, text=text, total=total)
+            try:
+                process_in_pool(processor_class, filenames, message_sender, args.jobs, options, game_options)
+            finally:
+                analyzed = message_sender.analyzed
+        else:
+            with tqdm(filenames) as bar:
+                for filename in bar:
+                    analyzed = bar.n
+                    processor = processor_class(
+                        filename=filename,
+                        message_sender=MessageSender(client=client, id=name, text=text, analyzed=bar.n, total=total),
+                        jobs=args.jobs,
+                        **options,
+                        **game_options.get(filename, {}),
+                    )
+                    processor()
+
+        report(client, f"{name} {title} completed.", total, total)
+    except KeyboardInterrupt:
+        print("Interrupted.")
+        report(client, f"{name} {title} interrupted.", analyzed, total)
+    except FileNotFoundError:
+        print("Stockfish is not properly installed.")
+        report(client, f"{name} Stockfish error.", analyzed, total)
+
+    client.close()
@@ -2,11 +2,13 @@ import hashlib
 import os
 import re
 import subprocess
+from typing import Optional
 
 import chess
 import chess.pgn
 
 from modules.configuration import load_configuration
+from modules.pgn_index import get_pgn_index
 
 UCI_MOVE_PATTERN = re.compile(r"[a-h][1-8][a-h][1-8]")
 FILENAME_PATTERN = re.compile(r"\d+\.pgn")
@@ -83,5 +85,22 @@ def convert(pgn_path: str) -> tuple[str, list[str]]:
     return name, filenames
 
 
+def index_games(pgn_path: str, shard: Optional[tuple[int, int]] = None) -> tuple[str, list[int]]:
+    pgn_index = get_pgn_index(pgn_path)
+    name = f"[{pgn_index.digest[:6]}]"
+    if shard is None:
+        return name, list(range(len(pgn_index)))
+
+    return name, list(pgn_index.get_shard(*shard))
+
+
+def parse_shard(shard: str) -> tuple[int, int]:
+    number, count = map(int, shard.split("/"))
+    if not 1 <= number <= count:
+        raise ValueError(f"invalid shard: {shard}")
+
+    return number, count
+
+
 def uci_to_san(board: chess.Board, move: str) -> str:
     return board.san(chess.Move.from_uci(move))
@@ -15,6 +15,7 @@ from tqdm import tqdm
 from modules.endgame import TABLEBASE_PATH, TEMP_PATH
 from modules.endgame.database import EndgameDatabase
 from modules.endgame.layout import PiecesLayout
+from modules.metrics import metrics, push_metrics
 from modules.server.client import DummyClient
 from modules.structures.message import Message
 from modules.symmetry.combination import Combination
@@ -130,7 +131,8 @@ class EndgameGenerator:
                 desc="Processing positions",
                 total=total,
             ):
-                partial_result, fen = future.result()
+                partial_result, fen, batch_metrics = future.result()
+                metrics.merge(batch_metrics)
                 partial_results_file = partial_results_path / f"{i:04d}.pkl"
                 self.save_partial_results(partial_results_file, partial_result)
                 self.send_message(j + 1, total, fen)
@@ -152,7 +154,7 @@ class EndgameGenerator:
         batch,
         pieces_layout: PiecesLayout,
         tablebase_path: Union[str, os.PathLike] = TABLEBASE_PATH,
-    ) -> Tuple[List[Tuple], Optional[str]]:
+    ) -> Tuple[List[Tuple], Optional[str], dict]:
         results = []
         tablebase_path = Path(tablebase_path)
         syzygy = chess.syzygy.open_tablebase(str(tablebase_path / "syzygy"))
@@ -169,7 +171,9 @@ class EndgameGenerator:
 
                 arrangement = ",".join(map(str, squares))
                 try:
+                    metrics.increment("tablebase_probes_total", tablebase="syzygy")
                     dtz = int(syzygy.probe_dtz(board))
+                    metrics.increment("tablebase_probes_total", tablebase="gaviota")
                     dtm = int(gaviota.probe_dtm(board))
                     results.append(
                         (
@@ -189,7 +193,7 @@ class EndgameGenerator:
         arrangement = tuple(map(int, arrangement.split(","))) if arrangement else None
         fen = EndgameGenerator.get_fen_from_arrangement(arrangement, pieces_layout)
 
-        return results, fen
+        return results, fen, metrics.pop()
 
     @staticmethod
     def save_partial_results(path: Union[str, os.PathLike], items: List[Tuple]) -> None:
@@ -217,3 +221,4 @@ class EndgameGenerator:
         message = Message(text=text, analyzed=analyzed, total=total, fen=fen)
 
         self.client.send(message.encode())
+        push_metrics(self.client)
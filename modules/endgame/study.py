@@ -13,6 +13,7 @@ from modules.endgame.game_info import GameInfo
 from modules.endgame.hint import Hint
 from modules.endgame.layout import PiecesLayout
 from modules.endgame.result import LosingOrDrawingSideResult, Result, WinningSideResult
+from modules.metrics import metrics
 from modules.structures.move_reply import MoveReply
 from modules.symmetry.transformations import o2
 
@@ -35,6 +36,14 @@ class EndgameStudy:
     def __del__(self):
         self.tablebase.close()
 
+    def probe_dtm(self) -> int:
+        metrics.increment("tablebase_probes_total", tablebase="gaviota")
+        return self.tablebase.probe_dtm(self.board)
+
+    def get_dtm(self) -> Optional[int]:
+        metrics.increment("tablebase_probes_total", tablebase="gaviota")
+        return self.tablebase.get_dtm(self.board)
+
     @staticmethod
     def get_bishop_color(square: int) -> bool:
         return bool((square + (square >> 3)) & 1)
@@ -101,7 +110,7 @@ class EndgameStudy:
     ) -> GameInfo:
         arrangement = self.draw_position(layout, side_pieces, dtm, dtz)
         self.set_board_from_arrangement(arrangement, layout, white, bishop_color)
-        dtm = self.tablebase.probe_dtm(self.board)
+        dtm = self.probe_dtm()
         return GameInfo(fen=self.starting_position, dtm=dtm)
 
     def play_move(self, move: chess.Move):
@@ -133,7 +142,7 @@ class EndgameStudy:
         for move in legal_moves:
             turn = self.board.turn
             self.board.push(move)
-            dtm = self.tablebase.get_dtm(self.board)
+            dtm = self.get_dtm()
             klass = WinningSideResult if previous_dtm < 0 else LosingOrDrawingSideResult
             result = klass.from_string(self.board.result(), turn)
             if dtm is not None:
@@ -180,7 +189,7 @@ class EndgameStudy:
 
     def get_best_move(self, fen: str) -> Hint:
         self.board = chess.Board(fen)
-        previous_dtm = self.tablebase.probe_dtm(self.board)
+        previous_dtm = self.probe_dtm()
         replies = self.prepare_replies(previous_dtm)
         move = self.choose_move(replies, float("inf"), SEED)
         uci = move.uci()
@@ -191,12 +200,12 @@ class EndgameStudy:
 
     def move(self, fen: str, uci: str, beta: float) -> MoveReply:
         self.board = chess.Board(fen)
-        previous_dtm = self.tablebase.probe_dtm(self.board)
+        previous_dtm = self.probe_dtm()
         move = chess.Move.from_uci(uci)
         legal_moves = len(list(self.board.legal_moves))
 
         self.play_move(move)
-        current_dtm = self.tablebase.probe_dtm(self.board)
+        current_dtm = self.probe_dtm()
         outcome = WinningSideResult.from_string(self.board.result(), self.board.turn)
         previous_rating = self.rate_move(legal_moves, previous_dtm, current_dtm, outcome)
 
@@ -214,7 +223,7 @@ class EndgameStudy:
         san = self.board.san(reply)
         legal_moves = len(list(self.board.legal_moves))
         self.play_move(reply)
-        new_dtm = self.tablebase.probe_dtm(self.board)
+        new_dtm = self.probe_dtm()
         outcome = WinningSideResult.from_string(self.board.result(), self.board.turn)
         current_rating = self.rate_move(legal_moves, current_dtm, new_dtm, outcome)
 
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Optional, Union
+
+from modules.configuration import load_configuration
+from modules.metrics import metrics
+
+configuration = load_configuration()
+
+CACHE_PATH = configuration["paths"]["evaluation_cache"]
+CACHE_MAX_ENTRIES = configuration["cache"]["max_entries"]
+CACHE_MEMORY_ENTRIES = configuration["cache"]["memory_entries"]
+
+EVICTION_RATIO = 0.9
+
+Result = Union[list[dict], dict]
+
+
+def normalize_fen(fen: str) -> str:
+    # halfmove and fullmove clocks do not change the engine's view of a position
+    return " ".join(fen.split()[:4])
+
+
+def get_engine_signature(path: str, depth: int, parameters: Optional[dict] = None) -> str:
+    try:
+        stat = os.stat(path)
+        binary = f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        binary = path
+
+    # options such as the skill level change results of the same binary
+    options = json.dumps(parameters or {}, sort_keys=True)
+    return hashlib.md5(f"{binary}|{depth}|{options}".encode()).hexdigest()
+
+
+class EvaluationCache:
+    def __init__(
+        self,
+        signature: str,
+        path: str = CACHE_PATH,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        memory_entries: int = CACHE_MEMORY_ENTRIES,
+    ):
+        self.signature: str = signature
+        self.path: str = path
+        self.max_entries: int = max_entries
+        self.memory_entries: int = memory_entries
+        self.memory: OrderedDict[tuple, str] = OrderedDict()
+        self.accessed: dict[tuple, int] = {}
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.create_tables()
+        self.validate()
+        self.size: int = self.count()
+        self.tick: int = self.get_tick()
+
+    def __str__(self):
+        return "Evaluation cache: {hits} hits, {misses} misses ({rate:.2f}% hit rate), {size} entries.".format(
+            hits=self.hits,
+            misses=self.misses,
+            rate=100 * self.hit_rate,
+            size=self.size,
+        )
+
+    def create_tables(self):
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS evaluations (
+                kind TEXT NOT NULL,
+                position TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                multipv INTEGER NOT NULL,
+                result TEXT NOT NULL,
+                accessed INTEGER NOT NULL,
+                PRIMARY KEY (kind, position, depth, multipv)
+            )
+        """
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON evaluations (accessed)")
+        cursor.execute("CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.connection.commit()
+
+    def validate(self):
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT value FROM metadata WHERE key = 'signature'")
+        row = cursor.fetchone()
+        if row is None or row[0] != self.signature:
+            self.invalidate()
+
+    def invalidate(self):
+        cursor = self.connection.cursor()
+        cursor.execute("DELETE FROM evaluations")
+        cursor.execute("INSERT OR REPLACE INTO metadata VALUES ('signature', ?)", (self.signature,))
+        self.connection.commit()
+        self.memory.clear()
+        self.size = 0
+
+    def count(self) -> int:
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM evaluations")
+        return cursor.fetchone()[0]
+
+    def get_tick(self) -> int:
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT COALESCE(MAX(accessed), 0) + 1 FROM evaluations")
+        return cursor.fetchone()[0]
+
+    def next_tick(self) -> int:
+        # ticks of other processes sharing the file are not followed, so the eviction order is approximate
+        self.tick += 1
+        return self.tick
+
+    def write_accessed(self, cursor: sqlite3.Cursor):
+        """
+        Write access ticks of hits collected since the last write, so that reads do not start write transactions.
+        """
+        if self.accessed:
+            cursor.executemany(
+                "UPDATE evaluations SET accessed = ? WHERE kind = ? AND position = ? AND depth = ? AND multipv = ?",
+                [(tick, *key) for key, tick in self.accessed.items()],
+            )
+            self.accessed.clear()
+
+    @staticmethod
+    def get_key(kind: str, fen: str, depth: int, multipv: int) -> tuple[str, str, int, int]:
+        return kind, normalize_fen(fen), int(depth), int(multipv)
+
+    def get(self, kind: str, fen: str, depth: int, multipv: int) -> Optional[Result]:
+        key = self.get_key(kind, fen, depth, multipv)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            metrics.increment("evaluation_cache_lookups_total", result="hit")
+            return json.loads(self.memory[key])
+
+        cursor = self.connection.cursor()
+        cursor.execute(
+            "SELECT result FROM evaluations WHERE kind = ? AND position = ? AND depth = ? AND multipv = ?",
+            key,
+        )
+        row = cursor.fetchone()
+        if row is None:
+            self.misses += 1
+            metrics.increment("evaluation_cache_lookups_total", result="miss")
+            return None
+
+        self.accessed[key] = self.next_tick()
+        self.remember(key, row[0])
+        self.hits += 1
+        metrics.increment("evaluation_cache_lookups_total", result="hit")
+        return json.loads(row[0])
+
+    def put(self, kind: str, fen: str, depth: int, multipv: int, result: Result):
+        key = self.get_key(kind, fen, depth, multipv)
+        serialized = json.dumps(result)
+        cursor = self.connection.cursor()
+        cursor.execute(
+            "INSERT OR IGNORE INTO evaluations VALUES (?, ?, ?, ?, ?, ?)", (*key, serialized, self.next_tick())
+        )
+        # only a new row changes the size, a result searched again by another process replaces the stored one
+        added = cursor.rowcount
+        if not added:
+            cursor.execute(
+                "UPDATE evaluations SET result = ?, accessed = ? "
+                "WHERE kind = ? AND position = ? AND depth = ? AND multipv = ?",
+                (serialized, self.tick, *key),
+            )
+        self.write_accessed(cursor)
+        self.connection.commit()
+
+        self.remember(key, serialized)
+        self.size += added
+        if self.size > self.max_entries:
+            self.evict()
+
+    def remember(self, key: tuple, serialized: str):
+        self.memory[key] = serialized
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        # other processes may share the file, so the actual size is recounted first
+        self.size = self.count()
+        excess = self.size - int(self.max_entries * EVICTION_RATIO)
+        if excess <= 0:
+            return
+
+        cursor = self.connection.cursor()
+        cursor.execute(
+            """
+            DELETE FROM evaluations WHERE rowid IN (
+                SELECT rowid FROM evaluations ORDER BY accessed LIMIT ?
+            )
+        """,
+            (excess,),
+        )
+        self.connection.commit()
+        self.size -= excess
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def statistics(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "size": self.size,
+        }
+
+    def close(self):
+        cursor = self.connection.cursor()
+        self.write_accessed(cursor)
+        self.connection.commit()
+        self.connection.close()
@@ -0,0 +1,253 @@
+from functools import wraps
+from typing import Optional
+
+from chess import Board
+from stockfish import Stockfish
+
+from modules.configuration import load_configuration
+from modules.engine.cache import EvaluationCache, get_engine_signature
+from modules.engine.record import EngineRecord
+from modules.metrics import metrics
+
+configuration = load_configuration()
+
+STOCKFISH_PATH = configuration["paths"]["stockfish"]
+STOCKFISH_DEPTH = configuration["stockfish"]["depth"]
+STOCKFISH_PARAMETERS = configuration["stockfish"]["parameters"]
+STOCKFISH_MOVETIME = configuration["stockfish"]["movetime"]
+STOCKFISH_NODES = configuration["stockfish"]["nodes"]
+
+STOCKFISH_RECORD = configuration["stockfish"]["record"]
+
+CACHE_ENABLED = configuration["cache"]["enabled"]
+
+
+def measured(method):
+    """
+    Count calls of the engine method and measure their latency, including evaluation cache lookups.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics.increment("engine_calls_total", call=method.__name__)
+        with metrics.timer("engine_latency_seconds", call=method.__name__):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class Engine(Stockfish):
+    def __init__(
+        self,
+        path: str = STOCKFISH_PATH,
+        depth: int = STOCKFISH_DEPTH,
+        parameters: Optional[dict] = None,
+        cache: Optional[EvaluationCache] = None,
+        movetime: Optional[int] = None,
+        nodes: Optional[int] = None,
+        record: Optional[EngineRecord] = None,
+        replay: bool = False,
+    ):
+        """
+        `movetime` (in milliseconds) and `nodes` limit every search in addition to the depth. Results of limited
+        searches are not cached, as they do not depend on the depth only.
+
+        `record` collects results of all searches. With `replay`, results found in the record are returned without
+        searching, and Stockfish is started only when a position is not found there. Until then, positions are tracked
+        on a board.
+        """
+        self.movetime: Optional[int] = movetime
+        self.nodes: Optional[int] = nodes
+        self.searches: int = 0
+        self.cache: Optional[EvaluationCache] = None if self.limited else cache
+        self.record: Optional[EngineRecord] = record
+        self.replay: bool = replay and record is not None
+        self.board: Optional[Board] = None
+        if self.replay:
+            self._path = path
+            self.depth = str(depth)
+            self._parameters = {"MultiPV": 1, **(parameters or {})}
+            self._pending_parameters = parameters
+            self.board = Board()
+        else:
+            super().__init__(path=path, depth=depth, parameters=parameters)
+
+    @property
+    def started(self) -> bool:
+        return self.board is None
+
+    def start(self):
+        """
+        Start Stockfish in the position of the board, if it is not running yet.
+        """
+        if self.started:
+            return
+
+        super().__init__(path=self._path, depth=int(self.depth), parameters=self._pending_parameters)
+        super().set_fen_position(self.board.fen())
+        self.board = None
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.movetime or self.nodes)
+
+    def _go(self):
+        self.searches += 1
+        command = f"go depth {self.depth}"
+        if self.movetime:
+            command += f" movetime {self.movetime}"
+        if self.nodes:
+            command += f" nodes {self.nodes}"
+
+        self._put(command)
+
+    def get_limited_top_moves(self, num_top_moves: int) -> list[dict]:
+        """
+        Like `get_top_moves`, but the search may stop before reaching the depth, so the last reported line of each
+        principal variation is taken.
+        """
+        self.start()
+        old_multipv = self._parameters["MultiPV"]
+        if num_top_moves != old_multipv:
+            self._set_option("MultiPV", num_top_moves)
+            self._parameters.update({"MultiPV": num_top_moves})
+
+        self._go()
+        lines = {}
+        while True:
+            line = self._read_line().split(" ")
+            if line[0] == "bestmove":
+                break
+            elif "multipv" in line and "pv" in line and "lowerbound" not in line and "upperbound" not in line:
+                lines[int(line[line.index("multipv") + 1])] = line
+
+        if num_top_moves != old_multipv:
+            self._set_option("MultiPV", old_multipv)
+            self._parameters.update({"MultiPV": old_multipv})
+
+        if line[1] == "(none)":
+            return []
+
+        multiplier = 1 if "w" in self.get_fen_position() else -1
+        top_moves = []
+        for _, line in sorted(lines.items())[:num_top_moves]:
+            top_moves.append(
+                {
+                    "Move": line[line.index("pv") + 1],
+                    "Centipawn": int(line[line.index("cp") + 1]) * multiplier if "cp" in line else None,
+                    "Mate": int(line[line.index("mate") + 1]) * multiplier if "mate" in line else None,
+                }
+            )
+
+        return top_moves
+
+    @measured
+    def set_fen_position(self, fen_position: str, send_ucinewgame_token: bool = True):
+        if not self.started:
+            self.board = Board(fen_position)
+            return
+
+        super().set_fen_position(fen_position, send_ucinewgame_token)
+
+    def make_moves_from_current_position(self, moves: Optional[list[str]]):
+        if self.started:
+            super().make_moves_from_current_position(moves)
+            return
+
+        for move in moves or []:
+            try:
+                self.board.push_uci(move)
+            except ValueError:
+                raise ValueError(f"Cannot make move: {move}")
+
+    def get_fen_position(self) -> str:
+        return super().get_fen_position() if self.started else self.board.fen()
+
+    @measured
+    def get_top_moves(self, num_top_moves: int = 5) -> list[dict]:
+        if self.record is None:
+            return self.search_top_moves(num_top_moves)
+
+        fen = self.get_fen_position()
+        top_moves = self.record.get("top_moves", fen, self.depth, num_top_moves) if self.replay else None
+        if top_moves is None:
+            top_moves = self.search_top_moves(num_top_moves)
+            self.record.put("top_moves", fen, self.depth, num_top_moves, top_moves)
+
+        return top_moves
+
+    def search_top_moves(self, num_top_moves: int) -> list[dict]:
+        if self.limited:
+            return self.get_limited_top_moves(num_top_moves)
+
+        if self.cache is None:
+            self.start()
+            return super().get_top_moves(num_top_moves)
+
+        fen = self.get_fen_position()
+        top_moves = self.cache.get("top_moves", fen, self.depth, num_top_moves)
+        if top_moves is None:
+            self.start()
+            top_moves = super().get_top_moves(num_top_moves)
+            self.cache.put("top_moves", fen, self.depth, num_top_moves, top_moves)
+
+        return top_moves
+
+    @measured
+    def get_evaluation(self) -> dict:
+        if self.record is None:
+            return self.search_evaluation()
+
+        fen = self.get_fen_position()
+        multipv = self._parameters["MultiPV"]
+        evaluation = self.record.get("evaluation", fen, self.depth, multipv) if self.replay else None
+        if evaluation is None:
+            evaluation = self.search_evaluation()
+            self.record.put("evaluation", fen, self.depth, multipv, evaluation)
+
+        return evaluation
+
+    def search_evaluation(self) -> dict:
+        if self.cache is None:
+            self.start()
+            return super().get_evaluation()
+
+        fen = self.get_fen_position()
+        multipv = self._parameters["MultiPV"]
+        evaluation = self.cache.get("evaluation", fen, self.depth, multipv)
+        if evaluation is None:
+            self.start()
+            evaluation = super().get_evaluation()
+            self.cache.put("evaluation", fen, self.depth, multipv, evaluation)
+
+        return evaluation
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def __del__(self):
+        if self.started:
+            super().__del__()
+
+
+def get_engine(
+    depth: int = STOCKFISH_DEPTH,
+    cache: bool = CACHE_ENABLED,
+    record: Optional[EngineRecord] = None,
+    replay: bool = False,
+) -> Engine:
+    cache = cache and not (STOCKFISH_MOVETIME or STOCKFISH_NODES)
+    signature = get_engine_signature(STOCKFISH_PATH, depth, STOCKFISH_PARAMETERS)
+    evaluation_cache = EvaluationCache(signature) if cache else None
+    return Engine(
+        path=STOCKFISH_PATH,
+        depth=depth,
+        parameters=STOCKFISH_PARAMETERS,
+        cache=evaluation_cache,
+        movetime=STOCKFISH_MOVETIME,
+        nodes=STOCKFISH_NODES,
+        record=record,
+        replay=replay,
+    )
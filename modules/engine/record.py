@@ -0,0 +1,73 @@
+import os
+import pickle
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Optional
+
+from modules.engine.cache import EvaluationCache, Result
+from modules.picklable import Picklable
+
+RECORD_FILENAME = "engine.rec"
+
+
+@dataclass
+class EngineRecord(Picklable):
+    """
+    Results of engine searches of a single game: the principal variations of `get_top_moves` and the evaluations,
+    keyed like the evaluation cache. The record is stored in the output directory of the game, so that it can be
+    processed again with other thresholds, searching only positions not found in the record.
+    """
+
+    results: dict[tuple, Result] = field(default_factory=dict)
+    searched: int = 0
+
+    def __len__(self):
+        return len(self.results)
+
+    def __str__(self):
+        return f"Engine record: {len(self)} results, {self.searched} searched in this run."
+
+    def get(self, kind: str, fen: str, depth: int, multipv: int) -> Optional[Result]:
+        return self.results.get(EvaluationCache.get_key(kind, fen, depth, multipv))
+
+    def put(self, kind: str, fen: str, depth: int, multipv: int, result: Result):
+        self.results[EvaluationCache.get_key(kind, fen, depth, multipv)] = result
+        self.searched += 1
+
+    def get_added(self, size: int) -> dict[tuple, Result]:
+        """
+        Return results added after the record had `size` results.
+        """
+        return dict(islice(self.results.items(), size, None))
+
+    def update(self, results: dict[tuple, Result]):
+        """
+        Add results searched by another engine.
+        """
+        self.results.update(results)
+        self.searched += len(results)
+
+    def to_file(self, path: str):
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as file:
+            pickle.dump(self, file)
+
+        os.replace(temporary_path, path)
+
+    def save(self, directory: str):
+        self.to_file(os.path.join(directory, RECORD_FILENAME))
+
+    @staticmethod
+    def load(directory: str) -> "EngineRecord":
+        path = os.path.join(directory, RECORD_FILENAME)
+        if not os.path.exists(path):
+            return EngineRecord()
+
+        try:
+            record = EngineRecord.from_file(path)
+        except (pickle.UnpicklingError, EOFError, AttributeError):
+            print(f"Corrupted engine record {path}, starting a new one.")
+            return EngineRecord()
+
+        record.searched = 0
+        return record
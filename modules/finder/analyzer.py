@@ -1,16 +1,34 @@
 import os
-
-from chess import Board
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from copy import deepcopy
+from functools import partial
+from typing import Optional, Union
+
+from chess import Board, Move
 from chess.pgn import Headers
-from stockfish import Stockfish
 
 from modules.configuration import load_configuration
 from modules.converter import uci_to_san
-from modules.finder.tactic_finder import TacticFinder
+from modules.engine.engine import CACHE_ENABLED, STOCKFISH_RECORD, Engine, get_engine
+from modules.finder.auxiliary import get_evaluation_from_top_moves
+from modules.finder.parallel import evaluate_position, initialize_worker, search_ply
+from modules.finder.tactic_finder import (
+    DEEPENING_DEPTHS,
+    TREE_TIME_BUDGET,
+    TacticFinder,
+)
+from modules.finder.triage import TRIAGE_DEPTH, select_plies, triage_game
 from modules.json import json_save
+from modules.metrics import metrics
 from modules.processor import Processor
+from modules.structures.checkpoint import Checkpoint
 from modules.structures.evaluation import Evaluation
+from modules.structures.message_sender import MessageSender
+from modules.structures.ply_result import PlyResult
 from modules.structures.position import Position
+from modules.structures.statistics import Statistics
 from modules.structures.tactic import Tactic
 from modules.structures.variations import Variations
 
@@ -18,17 +36,75 @@ configuration = load_configuration()
 
 INPUT_DIRECTORY = configuration["paths"]["processed"]
 OUTPUT_DIRECTORY = configuration["paths"]["tactics"]
-STOCKFISH_PATH = configuration["paths"]["stockfish"]
 
 STOCKFISH_DEPTH = configuration["stockfish"]["depth"]
-STOCKFISH_PARAMETERS = configuration["stockfish"]["parameters"]
 STOCKFISH_TOP_MOVES = configuration["stockfish"]["top_moves"]
 
+TRIAGE = configuration["analysis"]["triage"]
+GAME_TIME_BUDGET = configuration["analysis"]["game_time_budget"]
+
 IGNORE_FIRST_MOVE = configuration["export"]["ignore_first_move"]
 SAVE_LAST_OPPONENT_MOVE = configuration["export"]["save_last_opponent_move"]
 
 
 class Analyzer(Processor):
+    def __init__(
+        self,
+        filename: Union[str, int],
+        message_sender: MessageSender,
+        jobs: int = 1,
+        triage: bool = TRIAGE,
+        pgn_path: Optional[str] = None,
+        shared_plies: Optional[dict[int, PlyResult]] = None,
+        cache: bool = CACHE_ENABLED,
+        record: bool = STOCKFISH_RECORD,
+        replay: bool = False,
+        deepening_depths: Optional[list[int]] = None,
+    ):
+        super().__init__(filename, message_sender, pgn_path, cache, record, replay)
+        self.jobs = jobs
+        self.triage = triage
+        self.deepening_depths = DEEPENING_DEPTHS if deepening_depths is None else deepening_depths
+        self.shared_plies = {} if shared_plies is None else shared_plies
+
+    @staticmethod
+    def report_triage(plies: Optional[set[int]], moves: list[str]):
+        if plies is not None:
+            skipped = len(moves) - len(plies)
+            print(f"Triage: {skipped} of {len(moves)} plies skipped.")
+
+    def report_move(self, board: Board, idx: int, move: str, evaluation: Evaluation, output_filename: str):
+        metrics.increment("plies_total", processor="analysis")
+        move_number = (idx + 1 - int(board.turn)) // 2 + 1
+        white = board.turn
+
+        board_move = uci_to_san(board, move)
+        board.push_san(move)
+
+        move_string = f'{move_number}{"." if white else "..."} {board_move} {"   " if white else " "}'
+        print(f"{move_string}\t{evaluation}")
+
+        self.message_sender(
+            filename=output_filename,
+            fen=board.fen(),
+            move_string=move_string,
+            turn=board.turn,
+            evaluation=evaluation,
+        )
+
+    def report_deepening(self, early_rejections: int):
+        if self.deepening_depths:
+            print(f"Deepening: {early_rejections} nodes rejected at a lower depth.")
+
+    @staticmethod
+    def report_budget(truncated: int):
+        if GAME_TIME_BUDGET is not None or TREE_TIME_BUDGET is not None:
+            print(f"Time budget: {truncated} tactic trees truncated.")
+
+    @staticmethod
+    def get_deadline() -> Optional[float]:
+        return None if GAME_TIME_BUDGET is None else time.time() + GAME_TIME_BUDGET
+
     def find_variations(
         self,
         moves,
@@ -36,9 +112,36 @@ class Analyzer(Processor):
         headers: Headers,
         output_filename: str,
         stockfish_depth: int = STOCKFISH_DEPTH,
+        checkpoint_path: Optional[str] = None,
     ) -> tuple[list[Variations], [Tactic]]:
-        stockfish = Stockfish(path=STOCKFISH_PATH, depth=stockfish_depth, parameters=STOCKFISH_PARAMETERS)
+        """
+        Find tactics in the game. If `checkpoint_path` is given, tactics are saved next to it as soon as they are
+        found, and the analysis is resumed from the checkpoint after the last analyzed ply.
+        """
+        if self.jobs > 1:
+            return self.find_variations_in_parallel(
+                moves=moves,
+                starting_position=starting_position,
+                headers=headers,
+                output_filename=output_filename,
+                stockfish_depth=stockfish_depth,
+                checkpoint_path=checkpoint_path,
+            )
 
+        with closing(get_engine(stockfish_depth, self.cache, self.engine_record, self.replay)) as stockfish:
+            return self.search_variations(
+                stockfish, moves, starting_position, headers, output_filename, checkpoint_path
+            )
+
+    def search_variations(
+        self,
+        stockfish: Engine,
+        moves,
+        starting_position: str,
+        headers: Headers,
+        output_filename: str,
+        checkpoint_path: Optional[str],
+    ) -> tuple[list[Variations], [Tactic]]:
         if starting_position:
             board = Board(starting_position)
             stockfish.set_fen_position(starting_position)
@@ -47,83 +150,312 @@ class Analyzer(Processor):
 
         variations_list = []
         tactic_list = []
-        fens = set()
+        checkpoint = Checkpoint.load(checkpoint_path)
+        deadline = self.get_deadline()
+        self.statistics = Statistics(plies=len(moves) - checkpoint.ply)
+
+        plies = None
+        if self.triage:
+            if checkpoint.triage_evaluations is None:
+                start = time.perf_counter()
+                checkpoint.triage_evaluations = triage_game(stockfish, moves, starting_position)
+                self.statistics.add_phase("triage", time.perf_counter() - start)
+
+            triage_evaluations = checkpoint.triage_evaluations
+            plies = select_plies(triage_evaluations, starting_position)
+            evaluation = triage_evaluations[0]
+        elif not checkpoint.ply:
+            evaluation = Evaluation.from_evaluation(stockfish.get_evaluation())
+
+        if checkpoint.ply:
+            self.report_resume(checkpoint, moves)
+            for move in moves[: checkpoint.ply]:
+                board.push_uci(move)
+
+            stockfish.make_moves_from_current_position(moves[: checkpoint.ply])
+            evaluation = checkpoint.evaluation
 
-        evaluation = Evaluation.from_evaluation(stockfish.get_evaluation())
-        for idx, move in enumerate(moves):
-            move_number = (idx + 1 - int(board.turn)) // 2 + 1
+        start = time.perf_counter()
+        for idx, move in enumerate(moves[checkpoint.ply :], checkpoint.ply):
             white = board.turn
 
             fen = stockfish.get_fen_position()
 
             position = Position(move=move, color=not white, evaluation=evaluation, fen=fen)
 
+            check = board.gives_check(Move.from_uci(move))
             stockfish.make_moves_from_current_position([move])
-            evaluation = Evaluation.from_evaluation(stockfish.get_evaluation())
-            board_move = uci_to_san(board, move)
-            board.push_san(move)
-
-            move_string = f'{move_number}{"." if white else "..."} {board_move} {"   " if white else " "}'
-            print(f"{move_string}\t{evaluation}")
-
-            self.message_sender(
-                filename=output_filename,
-                fen=board.fen(),
-                move_string=move_string,
-                turn=board.turn,
-                evaluation=evaluation,
+            if plies is not None and idx not in plies:
+                evaluation = triage_evaluations[idx + 1]
+                self.report_move(board, idx, move, evaluation, output_filename)
+                self.save_checkpoint(checkpoint, checkpoint_path, idx, evaluation)
+                continue
+
+            result = self.get_shared_ply(idx, headers)
+            if result is not None:
+                self.report_move(board, idx, move, result.evaluation, output_filename)
+                self.merge_ply_result(result, evaluation, variations_list, tactic_list, checkpoint, checkpoint_path)
+                evaluation = result.evaluation
+                self.save_checkpoint(checkpoint, checkpoint_path, idx, evaluation)
+                continue
+
+            tactic_finder = TacticFinder(
+                stockfish,
+                not white,
+                starting_position=position,
+                visited=checkpoint.visited,
+                ply=idx,
+                deadline=deadline,
+                deepening_depths=self.deepening_depths,
             )
+            best_moves = tactic_finder.search_root()
+            evaluation = get_evaluation_from_top_moves(best_moves, check)
+            self.report_move(board, idx, move, evaluation, output_filename)
 
-            tactic_finder = TacticFinder(stockfish, not white, starting_position=position, fens=fens)
             variations, tactic = tactic_finder.get_variations(headers=headers)
-            fens = fens.union(tactic_finder.visited_fens)
+            checkpoint.early_rejections += tactic_finder.early_rejections
+            checkpoint.truncated += tactic_finder.truncated
+            self.statistics.add_ply(
+                len(tactic_finder.visit_order), tactic_finder.early_rejections, tactic_finder.truncated
+            )
+            metrics.observe("tree_nodes_per_ply", len(tactic_finder.visit_order))
 
             if tactic:
-                tactic_list.append(tactic)
-                variations_list.append(variations)
-                print(f"Tactic:\n{tactic}")
+                self.add_tactic(variations, tactic, variations_list, tactic_list, checkpoint, checkpoint_path)
+
+            self.save_checkpoint(checkpoint, checkpoint_path, idx, evaluation)
+
+        self.statistics.add_phase("search", time.perf_counter() - start)
+        self.statistics.engine_searches = stockfish.searches
+        self.report_triage(plies, moves)
+        self.report_deepening(checkpoint.early_rejections)
+        self.report_budget(checkpoint.truncated)
+        if stockfish.cache is not None:
+            print(stockfish.cache)
 
         return variations_list, tactic_list
 
+    def find_variations_in_parallel(
+        self,
+        moves,
+        starting_position: str,
+        headers: Headers,
+        output_filename: str,
+        stockfish_depth: int = STOCKFISH_DEPTH,
+        checkpoint_path: Optional[str] = None,
+    ) -> tuple[list[Variations], [Tactic]]:
+        board = Board(starting_position) if starting_position else Board()
+        initial_fen = board.fen()
+        fens, turns = [], []
+        for move in moves:
+            fens.append(board.fen())
+            turns.append(board.turn)
+            board.push_uci(move)
+
+        variations_list = []
+        tactic_list = []
+        checkpoint = Checkpoint.load(checkpoint_path)
+        deadline = self.get_deadline()
+        self.statistics = Statistics(plies=len(moves) - checkpoint.ply)
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=initialize_worker,
+            initargs=(stockfish_depth, self.cache, self.get_worker_record(), self.replay),
+        )
+
+        try:
+            plies = None
+            if self.triage:
+                if checkpoint.triage_evaluations is None:
+                    start = time.perf_counter()
+                    triage_results = list(
+                        executor.map(partial(evaluate_position, depth=TRIAGE_DEPTH), fens + [board.fen()])
+                    )
+                    checkpoint.triage_evaluations = [evaluation for evaluation, _ in triage_results]
+                    for _, record in triage_results:
+                        self.update_engine_record(record)
+
+                    # a triage evaluation is a single search unless it is found in the evaluation cache
+                    self.statistics.engine_searches += len(checkpoint.triage_evaluations)
+                    self.statistics.add_phase("triage", time.perf_counter() - start)
+
+                triage_evaluations = checkpoint.triage_evaluations
+                plies = select_plies(triage_evaluations, starting_position)
+                evaluation = triage_evaluations[0]
+            elif not checkpoint.ply:
+                evaluation, record = executor.submit(evaluate_position, initial_fen).result()
+                self.update_engine_record(record)
+
+            if checkpoint.ply:
+                self.report_resume(checkpoint, moves)
+                evaluation = checkpoint.evaluation
+
+            start = time.perf_counter()
+            indices = [
+                idx
+                for idx in range(checkpoint.ply, len(moves))
+                if (plies is None or idx in plies) and idx not in self.shared_plies
+            ]
+            results = executor.map(
+                partial(search_ply, headers=headers, deadline=deadline, deepening_depths=self.deepening_depths),
+                indices,
+                [fens[idx] for idx in indices],
+                [moves[idx] for idx in indices],
+                [turns[idx] for idx in indices],
+            )
+
+            board = Board(initial_fen)
+            for move in moves[: checkpoint.ply]:
+                board.push_uci(move)
+
+            for idx, move in enumerate(moves[checkpoint.ply :], checkpoint.ply):
+                if plies is not None and idx not in plies:
+                    evaluation = triage_evaluations[idx + 1]
+                    self.report_move(board, idx, move, evaluation, output_filename)
+                    self.save_checkpoint(checkpoint, checkpoint_path, idx, evaluation)
+                    continue
+
+                result = self.get_shared_ply(idx, headers)
+                if result is None:
+                    result = next(results)
+                    self.statistics.add_ply(len(result.visit_order), result.early_rejections, result.truncated)
+                    self.statistics.engine_searches += result.searches
+                    metrics.observe("tree_nodes_per_ply", len(result.visit_order))
+                    metrics.merge(result.metrics)
+
+                self.report_move(board, idx, move, result.evaluation, output_filename)
+                self.merge_ply_result(result, evaluation, variations_list, tactic_list, checkpoint, checkpoint_path)
+                evaluation = result.evaluation
+                self.save_checkpoint(checkpoint, checkpoint_path, idx, evaluation)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        executor.shutdown()
+        self.statistics.add_phase("search", time.perf_counter() - start)
+        self.report_triage(plies, moves)
+        self.report_deepening(checkpoint.early_rejections)
+        self.report_budget(checkpoint.truncated)
+        return variations_list, tactic_list
+
+    def clear(self, directory: str):
+        for filename in os.listdir(directory):
+            if filename.startswith("tactic_"):
+                os.remove(os.path.join(directory, filename))
+
+    def get_shared_ply(self, idx: int, headers: Headers) -> Optional[PlyResult]:
+        if idx not in self.shared_plies:
+            return None
+
+        result = deepcopy(self.shared_plies[idx])
+        if result.tactic:
+            result.variations.headers = headers
+            result.tactic.headers = headers
+
+        return result
+
+    def merge_ply_result(
+        self,
+        result: PlyResult,
+        evaluation: Evaluation,
+        variations_list: list[Variations],
+        tactic_list: list[Tactic],
+        checkpoint: Checkpoint,
+        checkpoint_path: Optional[str],
+    ):
+        checkpoint.early_rejections += result.early_rejections
+        checkpoint.truncated += result.truncated
+        self.update_engine_record(result.record)
+
+        # searches run independently, so positions seen at earlier plies are resolved in ply order
+        result.resolve_occurrences(checkpoint.visited)
+        if result.tactic:
+            result.tactic[0].evaluation = evaluation
+            self.add_tactic(result.variations, result.tactic, variations_list, tactic_list, checkpoint, checkpoint_path)
+
     @staticmethod
-    def save_variations(
+    def report_resume(checkpoint: Checkpoint, moves: list[str]):
+        print(f"Resuming from ply {checkpoint.ply + 1} of {len(moves)}, {checkpoint.tactics} tactics found so far.")
+
+    @staticmethod
+    def save_checkpoint(checkpoint: Checkpoint, checkpoint_path: Optional[str], idx: int, evaluation: Evaluation):
+        checkpoint.ply = idx + 1
+        checkpoint.evaluation = evaluation
+        if checkpoint_path is not None:
+            checkpoint.to_file(checkpoint_path)
+
+    def add_tactic(
+        self,
+        variations: Variations,
+        tactic: Tactic,
         variations_list: list[Variations],
         tactic_list: list[Tactic],
+        checkpoint: Checkpoint,
+        checkpoint_path: Optional[str],
+    ):
+        variations_list.append(variations)
+        tactic_list.append(tactic)
+        metrics.increment("tactics_found_total", type=tactic.type)
+        print(f"Tactic:\n{tactic}")
+
+        if checkpoint_path is not None:
+            self.save_tactic(variations, tactic, checkpoint.tactics, os.path.dirname(checkpoint_path))
+
+        checkpoint.tactics += 1
+
+    @staticmethod
+    def save_tactic(
+        variations: Variations,
+        tactic: Tactic,
+        index: int,
         directory: str,
         ignore_first_move: bool = IGNORE_FIRST_MOVE,
         save_last_opponent_move: bool = SAVE_LAST_OPPONENT_MOVE,
     ):
-        for index, (variations, tactic) in enumerate(list(zip(variations_list, tactic_list))):
-            game = tactic.to_pgn(
-                ignore_first_move=ignore_first_move,
-                save_last_opponent_move=save_last_opponent_move,
-            )
+        game = tactic.to_pgn(
+            ignore_first_move=ignore_first_move,
+            save_last_opponent_move=save_last_opponent_move,
+        )
+
+        prefix = f"tactic_{index:04}"
 
-            prefix = f"tactic_{index:04}"
+        variations_filename = f"{prefix}.vars"
+        variations_path = os.path.join(directory, variations_filename)
+        variations.to_file(variations_path)
 
-            variations_filename = f"{prefix}.vars"
-            variations_path = os.path.join(directory, variations_filename)
-            variations.to_file(variations_path)
+        json_filename = f"{prefix}.json"
+        json_path = os.path.join(directory, json_filename)
+        json_save(variations.to_json(), json_path)
 
-            json_filename = f"{prefix}.json"
-            json_path = os.path.join(directory, json_filename)
-            json_save(variations.to_json(), json_path)
+        tactic_filename = f"{prefix}.tactic"
+        tactic_path = os.path.join(directory, tactic_filename)
+        tactic.to_file(tactic_path)
 
-            tactic_filename = f"{prefix}.tactic"
-            tactic_path = os.path.join(directory, tactic_filename)
-            tactic.to_file(tactic_path)
+        pgn_filename = f"{prefix}.pgn"
+        pgn_path = os.path.join(directory, pgn_filename)
+        print(game, file=open(pgn_path, "w"), end="\n\n")
 
-            pgn_filename = f"{prefix}.pgn"
-            pgn_path = os.path.join(directory, pgn_filename)
-            print(game, file=open(pgn_path, "w"), end="\n\n")
+    @staticmethod
+    def save_variations(
+        variations_list: list[Variations],
+        tactic_list: list[Tactic],
+        directory: str,
+        ignore_first_move: bool = IGNORE_FIRST_MOVE,
+        save_last_opponent_move: bool = SAVE_LAST_OPPONENT_MOVE,
+    ):
+        for index, (variations, tactic) in enumerate(list(zip(variations_list, tactic_list))):
+            Analyzer.save_tactic(variations, tactic, index, directory, ignore_first_move, save_last_opponent_move)
 
     def __call__(self):
-        game_path = os.path.join(INPUT_DIRECTORY, self.filename)
-        data = self.preprocess(game_path, OUTPUT_DIRECTORY)
+        data = self.preprocess(INPUT_DIRECTORY, OUTPUT_DIRECTORY)
 
         if data is None:
             return
 
+        self.process(data)
+
+    def process(self, data: tuple):
         (
             moves,
             headers,
@@ -134,23 +466,24 @@ class Analyzer(Processor):
         ) = data
         print(f"Finding tactics for: {output_filename}")
 
-        variations_list = None
-        tactic_list = None
-
         try:
-            variations_list, tactic_list = self.find_variations(
+            _, tactic_list = self.find_variations(
                 moves=moves,
                 starting_position=starting_position,
                 headers=headers,
                 output_filename=output_filename,
+                checkpoint_path=in_progress_file,
             )
 
         except ValueError as error:
-            print(f"Stockfish error: {error}")
+            print(f"Stockfish error: {error}. The analysis will be resumed from the last analyzed move.")
+            return
         except KeyboardInterrupt:
             raise KeyboardInterrupt("interrupted")
+        finally:
+            self.save_engine_record(directory)
+            self.message_sender.flush()
 
-        self.save_variations(variations_list, tactic_list, directory)
         print(f"Saved {len(tactic_list)} tactics." if tactic_list else "No tactics found.")
 
         os.remove(in_progress_file)
@@ -1,5 +1,7 @@
 import chess
 
+from modules.structures.evaluation import Evaluation
+
 
 def calculate_material_balance(board: chess.Board) -> int:
     white = board.occupied_co[chess.WHITE]
@@ -12,3 +14,37 @@ def calculate_material_balance(board: chess.Board) -> int:
         + 5 * (chess.popcount(white & board.rooks) - chess.popcount(black & board.rooks))
         + 9 * (chess.popcount(white & board.queens) - chess.popcount(black & board.queens))
     )
+
+
+PIECE_VALUES = {
+    chess.PAWN: 1,
+    chess.KNIGHT: 3,
+    chess.BISHOP: 3,
+    chess.ROOK: 5,
+    chess.QUEEN: 9,
+    chess.KING: 0,
+}
+
+
+def get_material_change(board: chess.Board, move: chess.Move) -> int:
+    # the change of the material balance caused by a move that is about to be pushed
+    change = 0
+    if board.is_en_passant(move):
+        change += PIECE_VALUES[chess.PAWN]
+    elif not board.is_castling(move):
+        captured = board.piece_type_at(move.to_square)
+        if captured is not None:
+            change += PIECE_VALUES[captured]
+
+    if move.promotion:
+        change += PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN]
+
+    return change if board.turn == chess.WHITE else -change
+
+
+def get_evaluation_from_top_moves(top_moves: list[dict], check: bool) -> Evaluation:
+    if top_moves:
+        return Evaluation.from_stockfish(top_moves[0])
+
+    # no legal moves: a checkmate or a stalemate
+    return Evaluation(0) if check else Evaluation(0.0)
@@ -0,0 +1,164 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union
+
+from chess import Board
+from chess.pgn import Headers
+
+from modules.configuration import load_configuration
+from modules.engine.engine import CACHE_ENABLED
+from modules.engine.record import EngineRecord
+from modules.finder.parallel import (
+    initialize_worker,
+    search_ply,
+    start_engine,
+    stop_engine,
+)
+from modules.metrics import metrics
+from modules.processor import Processor
+from modules.structures.ply_result import PlyResult
+
+configuration = load_configuration()
+
+STOCKFISH_DEPTH = configuration["stockfish"]["depth"]
+STOCKFISH_RECORD = configuration["stockfish"]["record"]
+
+
+class TrieNode:
+    __slots__ = ("children", "games", "fen", "turn", "result")
+
+    def __init__(self, fen: str, turn: bool):
+        self.children: dict[str, TrieNode] = {}
+        self.games: int = 0
+        self.fen: str = fen
+        self.turn: bool = turn
+        self.result: Optional[PlyResult] = None
+
+
+class OpeningTrie:
+    """
+    A trie of moves of games in a batch. Plies played in at least two games from the same position and after the same
+    moves are searched once, and their results are shared by all these games.
+    """
+
+    def __init__(self):
+        self.roots: dict[str, dict[str, TrieNode]] = {}
+        self.games: dict[Union[str, int], tuple[str, list[str]]] = {}
+        self.plies: int = 0
+        self.nodes: int = 0
+
+    def add(self, key: Union[str, int], starting_position: Optional[str], moves: list[str]):
+        board = Board(starting_position) if starting_position else Board()
+        self.games[key] = (board.fen(), moves)
+        self.plies += len(moves)
+
+        children = self.roots.setdefault(board.fen(), {})
+        for move in moves:
+            if move not in children:
+                children[move] = TrieNode(board.fen(), board.turn)
+                self.nodes += 1
+
+            node = children[move]
+            node.games += 1
+            children = node.children
+            board.push_uci(move)
+
+    def get_path(self, key: Union[str, int]) -> list[TrieNode]:
+        initial_fen, moves = self.games[key]
+        path = []
+        children = self.roots[initial_fen]
+        for move in moves:
+            node = children[move]
+            if node.games < 2:
+                break
+
+            path.append(node)
+            children = node.children
+
+        return path
+
+    def get_shared_nodes(self) -> list[tuple[int, str, TrieNode]]:
+        shared = []
+        stack = [(0, move, node) for children in self.roots.values() for move, node in children.items()]
+        while stack:
+            idx, move, node = stack.pop()
+            if node.games < 2:
+                continue
+
+            shared.append((idx, move, node))
+            stack.extend((idx + 1, child_move, child) for child_move, child in node.children.items())
+
+        return shared
+
+    def search(self, jobs: int = 1, stockfish_depth: int = STOCKFISH_DEPTH, record: bool = STOCKFISH_RECORD):
+        """
+        Search the shared plies. With `record`, results of engine searches are returned with the plies, so that they
+        are added to records of all games sharing them.
+        """
+        shared = self.get_shared_nodes()
+        if not shared:
+            self.report(0)
+            return
+
+        initargs = (stockfish_depth, CACHE_ENABLED, EngineRecord() if record else None)
+        arguments = (
+            [idx for idx, _, _ in shared],
+            [node.fen for _, _, node in shared],
+            [move for _, move, _ in shared],
+            [node.turn for _, _, node in shared],
+            [Headers() for _ in shared],
+        )
+
+        if jobs > 1:
+            executor = ProcessPoolExecutor(max_workers=jobs, initializer=initialize_worker, initargs=initargs)
+            try:
+                results = list(executor.map(search_ply, *arguments))
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+            executor.shutdown()
+        else:
+            start_engine(*initargs)
+            try:
+                results = list(map(search_ply, *arguments))
+            finally:
+                stop_engine()
+
+        for (_, _, node), result in zip(shared, results):
+            metrics.merge(result.metrics)
+            metrics.observe("tree_nodes_per_ply", len(result.visit_order))
+            result.metrics = {}
+            node.result = result
+
+        self.report(len(shared))
+
+    def get_shared_plies(self, key: Union[str, int]) -> dict[int, PlyResult]:
+        return {idx: node.result for idx, node in enumerate(self.get_path(key)) if node.result is not None}
+
+    def report(self, shared: int):
+        if self.plies:
+            saved = self.plies - self.nodes
+            print(
+                f"Opening trie: {self.nodes} unique of {self.plies} plies in {len(self.games)} games, "
+                f"{shared} shared plies searched once, {saved} searches saved ({saved / self.plies:.1%})."
+            )
+
+
+def build_opening_trie(
+    filenames: list[Union[str, int]],
+    input_directory: str,
+    output_directory: str,
+    pgn_path: Optional[str] = None,
+) -> OpeningTrie:
+    """
+    Build the trie of games not analyzed yet, games already found in `output_directory` are skipped by the analysis.
+    """
+    trie = OpeningTrie()
+    for filename in filenames:
+        processor = Processor(filename, None, pgn_path)
+        moves, game = processor.load_game(input_directory)
+        if not processor.is_finished(os.path.join(output_directory, processor.get_output_filename(game))):
+            trie.add(filename, game.headers.get("FEN"), moves)
+
+    return trie
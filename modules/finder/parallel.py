@@ -0,0 +1,130 @@
+from multiprocessing.util import Finalize
+from typing import Optional
+
+from chess import Board, Move
+from chess.pgn import Headers
+
+from modules.engine.engine import CACHE_ENABLED, Engine, get_engine
+from modules.engine.record import EngineRecord
+from modules.finder.auxiliary import get_evaluation_from_top_moves
+from modules.finder.tactic_finder import TacticFinder
+from modules.metrics import metrics
+from modules.structures.evaluation import Evaluation
+from modules.structures.ply_result import PlyResult
+from modules.structures.position import Position
+from modules.structures.search_result import SearchResult
+
+stockfish: Optional[Engine] = None
+reported: int = 0
+
+
+def initialize_worker(
+    stockfish_depth: int,
+    cache: bool = CACHE_ENABLED,
+    record: Optional[EngineRecord] = None,
+    replay: bool = False,
+):
+    """
+    Start the engine of a worker process. Results added to its `record` are returned with the next searched ply.
+    """
+    # a forked worker starts with a copy of values not pushed by the parent yet
+    metrics.reset()
+    start_engine(stockfish_depth, cache, record, replay)
+    # workers exit without running `atexit` handlers, so the access ticks of the cache are written by a finalizer
+    Finalize(stockfish, stockfish.close, exitpriority=0)
+
+
+def start_engine(
+    stockfish_depth: int,
+    cache: bool = CACHE_ENABLED,
+    record: Optional[EngineRecord] = None,
+    replay: bool = False,
+):
+    """
+    Start the engine used by the functions of this module, also in the main process when there are no workers.
+    """
+    global stockfish, reported
+    stockfish = get_engine(stockfish_depth, cache, record, replay)
+    reported = 0 if record is None else len(record)
+
+
+def stop_engine():
+    global stockfish
+    if stockfish is not None:
+        stockfish.close()
+        stockfish = None
+
+
+def get_added_record() -> dict:
+    global reported
+    if stockfish.record is None:
+        return {}
+
+    record = stockfish.record.get_added(reported)
+    reported = len(stockfish.record)
+    return record
+
+
+def evaluate_position(fen: str, depth: Optional[int] = None) -> tuple[Evaluation, dict]:
+    """
+    Evaluate the position, and return the evaluation with the results added to the engine record.
+    """
+    full_depth = stockfish.depth
+    if depth is not None:
+        stockfish.set_depth(depth)
+
+    stockfish.set_fen_position(fen)
+    evaluation = Evaluation.from_evaluation(stockfish.get_evaluation())
+    stockfish.set_depth(full_depth)
+    return evaluation, get_added_record()
+
+
+def search_position(fen: str, num_top_moves: int) -> SearchResult:
+    """
+    Search top moves of the position, as the review does for every position of the game.
+    """
+    searches = stockfish.searches
+    stockfish.set_fen_position(fen)
+    top_moves = stockfish.get_top_moves(num_top_moves)
+    return SearchResult(
+        top_moves=top_moves,
+        searches=stockfish.searches - searches,
+        metrics=metrics.pop(),
+        record=get_added_record(),
+    )
+
+
+def search_ply(
+    index: int,
+    fen: str,
+    move: str,
+    white: bool,
+    headers: Headers,
+    deadline: Optional[float] = None,
+    deepening_depths: Optional[list[int]] = None,
+) -> PlyResult:
+    searches = stockfish.searches
+    stockfish.set_fen_position(fen)
+    position = Position(move=move, color=not white, evaluation=None, fen=stockfish.get_fen_position())
+
+    check = Board(fen).gives_check(Move.from_uci(move))
+    stockfish.make_moves_from_current_position([move])
+    tactic_finder = TacticFinder(
+        stockfish, not white, starting_position=position, deadline=deadline, deepening_depths=deepening_depths
+    )
+    best_moves = tactic_finder.search_root()
+    evaluation = get_evaluation_from_top_moves(best_moves, check)
+
+    variations, tactic = tactic_finder.get_variations(headers=headers)
+    return PlyResult(
+        index=index,
+        evaluation=evaluation,
+        variations=variations,
+        tactic=tactic,
+        visit_order=tactic_finder.visit_order,
+        early_rejections=tactic_finder.early_rejections,
+        truncated=tactic_finder.truncated,
+        searches=stockfish.searches - searches,
+        metrics=metrics.pop(),
+        record=get_added_record(),
+    )
@@ -1,17 +1,21 @@
+import time
+from collections import Counter
 from typing import Optional
 
 import chess
-from anytree import Node
 from chess.pgn import Headers
+from chess.polyglot import zobrist_hash
 from stockfish import Stockfish
 
 from modules.configuration import load_configuration
-from modules.finder.auxiliary import calculate_material_balance
+from modules.finder.auxiliary import calculate_material_balance, get_material_change
 from modules.structures.evaluation import Evaluation
 from modules.structures.outcome import Outcome
 from modules.structures.position import Position, PositionOccurred
 from modules.structures.tactic import Tactic
-from modules.structures.variations import Variations, get_node_history
+from modules.structures.variation_tree import VariationTree
+from modules.structures.variations import Variations
+from modules.structures.visited_positions import VisitedPositions
 
 configuration = load_configuration()
 
@@ -25,6 +29,11 @@ MIN_RELATIVE_MATERIAL_BALANCE = configuration["algorithm"]["min_relative_materia
 
 STOCKFISH_TOP_MOVES = configuration["stockfish"]["top_moves"]
 
+DEEPENING_DEPTHS = configuration["analysis"]["deepening_depths"] if configuration["analysis"]["deepening"] else []
+DEEPENING_CENTIPAWN_MARGIN = configuration["analysis"]["deepening_centipawn_margin"]
+
+TREE_TIME_BUDGET = configuration["analysis"]["tree_time_budget"]
+
 
 class TacticFinder:
     def __init__(
@@ -38,17 +47,35 @@ class TacticFinder:
         checkmate_progress_threshold: float = CHECKMATE_PROGRESS_THRESHOLD,
         repetition_threshold: int = REPETITION_THRESHOLD,
         stockfish_top_moves: int = STOCKFISH_TOP_MOVES,
-        fens: set[str] = None,
+        visited: VisitedPositions = None,
+        ply: int = 0,
+        best_moves: Optional[list[dict]] = None,
+        deepening_depths: list[int] = None,
+        deepening_centipawn_margin: float = DEEPENING_CENTIPAWN_MARGIN,
+        time_budget: Optional[float] = TREE_TIME_BUDGET,
+        deadline: Optional[float] = None,
     ):
+        """
+        The tree search stops expanding positions after `time_budget` seconds or at the `deadline` timestamp,
+        whichever comes first. A tactic found in such a truncated tree is marked as not verified.
+        """
+
         self.stockfish: Stockfish = stockfish
-        self.fens: set[str] = set() if fens is None else fens
+        self.visited: VisitedPositions = VisitedPositions() if visited is None else visited
+        self.ply: int = ply
         self.white: bool = white
-        self.visited_fens: set[str] = set()
+        self.visit_order: list[int] = []
+        self.root_best_moves: Optional[list[dict]] = best_moves
 
         starting_fen: str = starting_position.fen
         self.starting_position: Position = starting_position
-        self.material_balance: int = calculate_material_balance(chess.Board(starting_fen))
+        self.board: chess.Board = chess.Board(starting_fen)
+        self.material_balance: int = calculate_material_balance(self.board)
+        self.material_balances: list[int] = [self.material_balance]
+        self.keys: list[int] = [zobrist_hash(self.board)]
+        self.key_counts: Counter[int] = Counter(self.keys)
         self.checkmate_counter: Optional[int] = None
+        self.tree: VariationTree = VariationTree()
 
         self.pawn_threshold: float = centipawn_threshold / 100
         self.pawn_limit: float = centipawn_limit / 100
@@ -57,6 +84,14 @@ class TacticFinder:
         self.repetition_threshold: int = repetition_threshold
         self.stockfish_top_moves: int = stockfish_top_moves
 
+        self.deepening_depths: list[int] = DEEPENING_DEPTHS if deepening_depths is None else deepening_depths
+        self.deepening_pawn_margin: float = deepening_centipawn_margin / 100
+        self.early_rejections: int = 0
+
+        self.time_budget: Optional[float] = time_budget
+        self.deadline: Optional[float] = deadline
+        self.truncated: bool = False
+
     def get_evaluations_from_best_moves(self, best_moves: list[dict] = None) -> list[Evaluation]:
         best_moves = self.stockfish.get_top_moves(self.stockfish_top_moves) if best_moves is None else best_moves
         return [Evaluation.from_stockfish(move) for move in best_moves]
@@ -107,6 +142,48 @@ class TacticFinder:
         else:
             raise ValueError("unexpected number of moves")
 
+    def is_clearly_rejected(self, best_moves: list[dict]) -> bool:
+        if len(best_moves) < 2:
+            return False
+
+        evaluations = self.get_evaluations_from_best_moves(best_moves)
+        evaluation = evaluations[0] if self.white else -evaluations[0]
+        next_evaluation = evaluations[1] if self.white else -evaluations[1]
+        if evaluation.mate or next_evaluation.mate:
+            return False
+
+        return (
+            evaluation.value - next_evaluation.value < self.pawn_threshold - self.deepening_pawn_margin
+            or evaluation.value < -self.deepening_pawn_margin
+            or evaluation.value > self.pawn_limit + self.deepening_pawn_margin
+        )
+
+    def get_best_moves(self, defender: bool = False, deepen: bool = True) -> list[dict]:
+        if deepen and not defender and self.deepening_depths:
+            full_depth = self.stockfish.depth
+            try:
+                for depth in self.deepening_depths:
+                    if depth >= int(full_depth):
+                        break
+
+                    self.stockfish.set_depth(depth)
+                    best_moves = self.stockfish.get_top_moves(self.stockfish_top_moves)
+                    if self.is_clearly_rejected(best_moves):
+                        self.early_rejections += 1
+                        return best_moves
+            finally:
+                self.stockfish.set_depth(full_depth)
+
+        return self.stockfish.get_top_moves(self.stockfish_top_moves)
+
+    def search_root(self) -> list[dict]:
+        """
+        Search the position after the game move at the full depth, because its top moves also give the evaluation of the
+        ply. Only positions inside the tree can be rejected at a lower depth.
+        """
+        self.root_best_moves = self.get_best_moves(deepen=False)
+        return self.root_best_moves
+
     def get_good_enough_moves(self, best_moves: list[dict] = None) -> list[str]:
         if len(best_moves) == 0:
             return []
@@ -135,45 +212,61 @@ class TacticFinder:
                     if not evaluation.mate and abs(best_evaluation - evaluation) < self.pawn_tolerance
                 ]
 
-    def get_board_from_history(self, node: Optional[Node]) -> chess.Board:
-        board = chess.Board(self.starting_position.fen)
-        if node is None:
-            return board
-        else:
-            history = get_node_history(node)
+    def push(self, move: str):
+        board_move = chess.Move.from_uci(move)
+        self.material_balances.append(self.material_balances[-1] + get_material_change(self.board, board_move))
+        self.board.push(board_move)
+        key = zobrist_hash(self.board)
+        self.keys.append(key)
+        self.key_counts[key] += 1
+
+    def pop(self):
+        self.board.pop()
+        self.material_balances.pop()
+        self.key_counts[self.keys.pop()] -= 1
 
-        for position in history:
-            if position.move:
-                board.push_san(position.move)
+    def create_tree(self) -> Optional[VariationTree]:
+        if self.starting_position.move:
+            self.push(self.starting_position.move)
 
-        return board
+        self.tree = VariationTree()
+        if self.time_budget is not None:
+            tree_deadline = time.time() + self.time_budget
+            self.deadline = tree_deadline if self.deadline is None else min(self.deadline, tree_deadline)
 
-    def create_tree(self) -> Optional[Node]:
         try:
-            root = self.find().root
-            root.name = self.starting_position
+            self.find()
         except PositionOccurred:
             return None
         except ValueError as error:
             print(f"Stockfish error: {error}")
             return None
 
-        return root
+        return self.tree
 
     def find(
         self,
         move: str = None,
         previous_fen: str = "",
         defender: bool = False,
-        parent: Node = None,
-    ) -> Node:
+        parent: int = -1,
+    ) -> int:
         fen = self.stockfish.get_fen_position()
-        self.visited_fens.add(fen)
-        if fen in self.fens:
+        key = self.keys[-1]
+        self.visited.visit(key, self.ply)
+        self.visit_order.append(key)
+        if self.visited.occurred_before(key, self.ply):
             raise PositionOccurred("position already occurred")
 
-        best_moves = self.stockfish.get_top_moves(self.stockfish_top_moves)
-        material_balance = self.get_relative_material_balance(fen)
+        early_rejections = self.early_rejections
+        if move is None and self.root_best_moves is not None:
+            best_moves = self.root_best_moves
+        else:
+            best_moves = self.get_best_moves(defender, deepen=move is not None)
+
+        # the evaluation and hardness of a position rejected at a lower depth are not those of the full depth
+        shallow = self.early_rejections > early_rejections
+        material_balance = self.get_relative_material_balance()
         color = self.white ^ defender
         forced = len(best_moves) == 1 and self.stockfish_top_moves > 1
         hard = defender or self.is_position_hard(best_moves)
@@ -200,46 +293,79 @@ class TacticFinder:
                 forced=forced,
                 hard=hard,
                 material_balance=material_balance,
+                shallow=shallow,
             )
 
-        node = Node(position, parent=parent)
-        board = self.get_board_from_history(node)
-        outcome = self.get_outcome(board, evaluation, material_balance)
-        node.name.outcome = outcome
+        outcome = self.get_outcome(self.board, evaluation, material_balance)
+        position.outcome = outcome
+        node = self.tree.add(position, parent)
 
         if outcome.type == "draw":
-            node.name.evaluation = Evaluation(0.0)
+            position.evaluation = Evaluation(0.0)
         else:
             if defender:
                 good_enough_responses = self.get_good_enough_moves(best_moves)
                 new_fen = self.stockfish.get_fen_position()
                 for response in good_enough_responses:
+                    if self.is_out_of_time():
+                        break
+
                     self.stockfish.set_fen_position(new_fen)
                     self.stockfish.make_moves_from_current_position([response])
+                    self.push(response)
                     self.find(response, fen, False, parent=node)
+                    self.pop()
 
             else:
-                if self.is_only_one_good_move(best_moves):
+                if self.is_only_one_good_move(best_moves) and not self.is_out_of_time():
                     best_move = best_moves[0]["Move"]
                     self.stockfish.make_moves_from_current_position([best_move])
+                    self.push(best_move)
                     self.find(best_move, fen, True, parent=node)
+                    self.pop()
 
             self.stockfish.set_fen_position(fen)
 
         return node
 
-    def get_relative_material_balance(self, fen: str) -> int:
-        board = chess.Board(fen)
-        material_balance = calculate_material_balance(board)
+    def is_out_of_time(self) -> bool:
+        if self.deadline is not None and time.time() > self.deadline:
+            self.truncated = True
+
+        return self.truncated
+
+    def get_relative_material_balance(self) -> int:
         coefficient = 1 if self.white else -1
-        return coefficient * (material_balance - self.material_balance)
+        return coefficient * (self.material_balances[-1] - self.material_balance)
+
+    def is_repetition(self) -> bool:
+        """
+        Check if the current position is repeated or a threefold repetition can be claimed, like
+        `board.is_repetition(self.repetition_threshold) or board.can_claim_threefold_repetition()`,
+        but with Zobrist keys of positions on the current path instead of replaying the board.
+        """
+        count = self.key_counts[self.keys[-1]]
+        if count >= self.repetition_threshold or count >= 3:
+            return True
+
+        if max(self.key_counts.values()) < 2:
+            return False
+
+        for move in self.board.legal_moves:
+            self.board.push(move)
+            key = zobrist_hash(self.board)
+            self.board.pop()
+            if self.key_counts[key] >= 2:
+                return True
+
+        return False
 
     def get_outcome(self, board: chess.Board, evaluation: Evaluation, material_balance: int) -> Outcome:
         if board.is_stalemate():
             return Outcome("draw", "stalemate")
         elif board.is_insufficient_material():
             return Outcome("draw", "insufficient material")
-        elif board.is_repetition(self.repetition_threshold) or board.can_claim_draw():
+        elif self.is_repetition() or board.can_claim_fifty_moves():
             return Outcome("draw", "repetition")
 
         if self.checkmate_counter:
@@ -256,9 +382,9 @@ class TacticFinder:
         return Outcome("not resolved")
 
     def get_variations(self, headers: Optional[Headers] = None) -> tuple[Optional[Variations], Optional[Tactic]]:
-        root = self.create_tree()
-        if root and root.children:
-            variations = Variations(root, headers=headers)
+        tree = self.create_tree()
+        if tree and tree.has_children():
+            variations = Variations(tree, headers=headers, verified=not self.truncated)
             tactic = variations.get_tactic()
             if tactic and not tactic[0].forced:
                 return variations, tactic
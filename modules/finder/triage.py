@@ -0,0 +1,69 @@
+from typing import Optional
+
+from chess import Board
+from stockfish import Stockfish
+
+from modules.configuration import load_configuration
+from modules.structures.evaluation import Evaluation
+
+configuration = load_configuration()
+
+TRIAGE_DEPTH = configuration["analysis"]["triage_depth"]
+TRIAGE_PAWN_THRESHOLD = configuration["analysis"]["triage_centipawn_threshold"] / 100
+
+MATE_PAWN_VALUE = 100.0
+
+
+def get_pawn_value(evaluation: Evaluation, white_to_move: bool) -> float:
+    if not evaluation.mate:
+        return evaluation.value
+
+    if evaluation.value == 0:
+        return -MATE_PAWN_VALUE if white_to_move else MATE_PAWN_VALUE
+
+    return MATE_PAWN_VALUE if evaluation.value > 0 else -MATE_PAWN_VALUE
+
+
+def triage_game(
+    stockfish: Stockfish,
+    moves: list[str],
+    starting_position: Optional[str],
+    depth: int = TRIAGE_DEPTH,
+) -> list[Evaluation]:
+    full_depth = stockfish.depth
+    stockfish.set_depth(depth)
+    if starting_position:
+        stockfish.set_fen_position(starting_position)
+    else:
+        stockfish.set_position()
+
+    evaluations = [Evaluation.from_evaluation(stockfish.get_evaluation())]
+    for move in moves:
+        stockfish.make_moves_from_current_position([move])
+        evaluations.append(Evaluation.from_evaluation(stockfish.get_evaluation()))
+
+    stockfish.set_depth(full_depth)
+    if starting_position:
+        stockfish.set_fen_position(starting_position)
+    else:
+        stockfish.set_position()
+
+    return evaluations
+
+
+def select_plies(
+    evaluations: list[Evaluation],
+    starting_position: Optional[str],
+    pawn_threshold: float = TRIAGE_PAWN_THRESHOLD,
+) -> set[int]:
+    white = Board(starting_position).turn if starting_position else True
+    plies = set()
+    for idx in range(len(evaluations) - 1):
+        mover = white ^ bool(idx % 2)
+        before = get_pawn_value(evaluations[idx], mover)
+        after = get_pawn_value(evaluations[idx + 1], not mover)
+        swing = before - after if mover else after - before
+        if swing >= pawn_threshold:
+            plies.add(idx)
+
+    return plies
@@ -1,11 +1,17 @@
 import json
-from typing import Dict, List, Union
+import os
+import threading
+from typing import Dict, List, Optional, Union
 
 
-def json_save(dictionary: Union[Dict, List], path: str, indent: int = 4):
-    with open(path, "w") as file:
+def json_save(dictionary: Union[Dict, List], path: str, indent: Optional[int] = 4):
+    # the file is replaced at once, so that it is never read half-written
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary_path, "w") as file:
         json.dump(dictionary, file, indent=indent)
 
+    os.replace(temporary_path, path)
+
 
 def json_load(path: str) -> Union[Dict, List]:
     with open(path, "r") as file:
@@ -0,0 +1,190 @@
+import bisect
+import json
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from typing import Optional
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+BUCKETS = {
+    "engine_latency_seconds": LATENCY_BUCKETS,
+    "tree_nodes_per_ply": COUNT_BUCKETS,
+}
+
+DESCRIPTIONS = {
+    "engine_calls_total": "Engine calls by type.",
+    "engine_latency_seconds": "Latency of engine calls by type.",
+    "tree_nodes_per_ply": "Nodes of a tactic tree expanded per searched ply.",
+    "plies_total": "Plies processed by the analysis and the review.",
+    "tactics_found_total": "Tactics found by type.",
+    "evaluation_cache_lookups_total": "Evaluation cache lookups by result.",
+    "tablebase_probes_total": "Tablebase probes by tablebase.",
+}
+
+METRICS_KEY = "metrics"
+
+Key = tuple[str, tuple[tuple[str, str], ...]]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts: list[int] = [0] * (len(buckets) + 1)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, dictionary: dict):
+        self.counts = [count + other for count, other in zip(self.counts, dictionary["counts"])]
+        self.sum += dictionary["sum"]
+        self.count += dictionary["count"]
+
+    def to_json(self) -> dict:
+        return {"counts": self.counts, "sum": self.sum, "count": self.count}
+
+
+class Metrics:
+    """
+    Counters and histograms of a process. Other processes push their values to the status server as deltas (see
+    `push_metrics`), where they are accumulated with the values of the server process and exposed at `/metrics`.
+    """
+
+    def __init__(self):
+        self.counters: dict[Key, float] = {}
+        self.histograms: dict[Key, Histogram] = {}
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def get_key(name: str, labels: dict) -> Key:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = self.get_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self.get_key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(BUCKETS.get(name, LATENCY_BUCKETS))
+
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def to_json(self) -> dict:
+        with self.lock:
+            return {
+                "counters": [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                "histograms": [
+                    [name, dict(labels), histogram.to_json()] for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def merge(self, dictionary: dict):
+        for name, labels, value in dictionary["counters"]:
+            self.increment(name, value, **labels)
+
+        with self.lock:
+            for name, labels, values in dictionary["histograms"]:
+                key = self.get_key(name, labels)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(BUCKETS.get(name, LATENCY_BUCKETS))
+
+                self.histograms[key].merge(values)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def pop(self) -> dict:
+        """
+        Return the values collected since the last call and reset them.
+        """
+        with self.lock:
+            dictionary = self.to_json()
+            self.reset()
+
+        return dictionary
+
+    def __bool__(self):
+        return bool(self.counters or self.histograms)
+
+    def encode(self) -> str:
+        return urllib.parse.urlencode({METRICS_KEY: json.dumps(self.pop())})
+
+    @staticmethod
+    def decode(string: str) -> Optional[dict]:
+        """
+        Return the metrics pushed in the message, or `None` if it is a status message.
+        """
+        if not string.startswith(f"{METRICS_KEY}="):
+            return None
+
+        return json.loads(urllib.parse.parse_qs(string)[METRICS_KEY][0])
+
+    @staticmethod
+    def format_labels(labels: tuple, **extra) -> str:
+        labels = list(labels) + [(key, str(value)) for key, value in extra.items()]
+        if not labels:
+            return ""
+
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+    def to_prometheus(self) -> str:
+        """
+        Render the values in the Prometheus text exposition format.
+        """
+        lines = []
+        with self.lock:
+            names = sorted({name for name, _ in self.counters} | {name for name, _ in self.histograms})
+            for name in names:
+                if name in DESCRIPTIONS:
+                    lines.append(f"# HELP {name} {DESCRIPTIONS[name]}")
+
+                counters = sorted((key, value) for key, value in self.counters.items() if key[0] == name)
+                histograms = sorted((key, value) for key, value in self.histograms.items() if key[0] == name)
+                if counters:
+                    lines.append(f"# TYPE {name} counter")
+                    for (_, labels), value in counters:
+                        lines.append(f"{name}{self.format_labels(labels)} {value}")
+                if histograms:
+                    lines.append(f"# TYPE {name} histogram")
+                    for (_, labels), histogram in histograms:
+                        cumulative = 0
+                        for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                            cumulative += count
+                            lines.append(f"{name}_bucket{self.format_labels(labels, le=bound)} {cumulative}")
+
+                        lines.append(f"{name}_sum{self.format_labels(labels)} {histogram.sum}")
+                        lines.append(f"{name}_count{self.format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def push_metrics(client):
+    """
+    Send the values collected since the last push to the status server.
+    """
+    if metrics:
+        client.send(metrics.encode())
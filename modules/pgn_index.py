@@ -0,0 +1,121 @@
+import hashlib
+import io
+import os
+import pickle
+import re
+from array import array
+from dataclasses import dataclass, field
+from functools import cache
+
+import chess.pgn
+
+from modules.picklable import Picklable
+
+INDEX_EXTENSION = ".idx"
+DIGEST_CHUNK_SIZE = 1 << 20
+# a file saved with a UTF-8 byte order mark starts with it before the first tag
+TAG_PATTERN = re.compile(rb"(?:\xef\xbb\xbf)?\[[A-Za-z0-9_]+\s")
+
+
+def get_digest(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as file:
+        while chunk := file.read(DIGEST_CHUNK_SIZE):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+@dataclass
+class PgnIndex(Picklable):
+    """
+    Byte offsets of games in a PGN file, stored next to the file with the `.idx` extension.
+    """
+
+    path: str
+    size: int
+    modified: int
+    digest: str
+    offsets: array = field(default_factory=lambda: array("Q"))
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def is_valid(self) -> bool:
+        """
+        Whether the PGN file is unchanged since it was indexed, by its size, modification time and content digest.
+        """
+        stat = os.stat(self.path)
+        if self.size != stat.st_size or self.modified != stat.st_mtime_ns:
+            return False
+
+        return self.digest == get_digest(self.path)
+
+    def read_game(self, index: int) -> chess.pgn.Game:
+        start = self.offsets[index]
+        end = self.offsets[index + 1] if index + 1 < len(self.offsets) else self.size
+        with open(self.path, "rb") as file:
+            file.seek(start)
+            text = file.read(end - start).decode("utf-8-sig", errors="replace")
+
+        return chess.pgn.read_game(io.StringIO(text))
+
+    def get_shard(self, shard: int, shards: int) -> range:
+        """
+        Return indices of games in the `shard`-th of `shards` contiguous parts, numbered from 1.
+        """
+        assert 1 <= shard <= shards, "shard number out of range"
+        return range(len(self) * (shard - 1) // shards, len(self) * shard // shards)
+
+    @staticmethod
+    def build(path: str) -> "PgnIndex":
+        stat = os.stat(path)
+        offsets = array("Q")
+        digest = hashlib.md5()
+
+        offset = 0
+        in_tags = False
+        with open(path, "rb") as file:
+            for line in file:
+                digest.update(line)
+                if TAG_PATTERN.match(line):
+                    if not in_tags:
+                        offsets.append(offset)
+                        in_tags = True
+                elif line.strip():
+                    if not offsets:
+                        # the first game has no tags
+                        offsets.append(offset)
+
+                    in_tags = False
+
+                offset += len(line)
+
+        return PgnIndex(path, stat.st_size, stat.st_mtime_ns, digest.hexdigest(), offsets)
+
+    @staticmethod
+    def load(path: str) -> "PgnIndex":
+        index_path = f"{path}{INDEX_EXTENSION}"
+        if os.path.exists(index_path):
+            try:
+                index = PgnIndex.from_file(index_path)
+            except (EOFError, pickle.UnpicklingError, AttributeError, ValueError, TypeError):
+                print(f"Corrupted index {index_path}, indexing again.")
+            else:
+                if isinstance(index, PgnIndex):
+                    index.path = path
+                    if index.is_valid():
+                        return index
+
+        print(f"Indexing PGN file {path}...")
+        index = PgnIndex.build(path)
+        # concurrent jobs indexing the same file never read a partially written index
+        temporary_path = f"{index_path}.{os.getpid()}.tmp"
+        index.to_file(temporary_path)
+        os.replace(temporary_path, index_path)
+        return index
+
+
+@cache
+def get_pgn_index(path: str) -> PgnIndex:
+    return PgnIndex.load(path)
@@ -0,0 +1,60 @@
+from typing import Optional, Union
+
+from modules.configuration import load_configuration
+from modules.engine.engine import CACHE_ENABLED, STOCKFISH_RECORD
+from modules.engine.record import EngineRecord
+from modules.finder.analyzer import Analyzer
+from modules.processor import Processor
+from modules.reviewer.reviewer import Reviewer
+from modules.structures.message_sender import MessageSender
+from modules.structures.ply_result import PlyResult
+
+configuration = load_configuration()
+
+INPUT_DIRECTORY = configuration["paths"]["processed"]
+TACTICS_DIRECTORY = configuration["paths"]["tactics"]
+REVIEWS_DIRECTORY = configuration["paths"]["reviews"]
+
+TRIAGE = configuration["analysis"]["triage"]
+
+
+class Pipeline(Processor):
+    """
+    Find tactics in a game and review it in one go. The analysis and the review share a single engine record, so a
+    position searched by both, like the root of every tactic tree, which is also the reviewed position after the
+    move, is searched once. Tactics and the review are the same as of separate runs.
+    """
+
+    def __init__(
+        self,
+        filename: Union[str, int],
+        message_sender: MessageSender,
+        jobs: int = 1,
+        triage: bool = TRIAGE,
+        pgn_path: Optional[str] = None,
+        shared_plies: Optional[dict[int, PlyResult]] = None,
+        cache: bool = CACHE_ENABLED,
+        record: bool = STOCKFISH_RECORD,
+        replay: bool = False,
+    ):
+        super().__init__(filename, message_sender, pgn_path, cache, record, replay)
+        self.analyzer = Analyzer(filename, message_sender, jobs, triage, pgn_path, shared_plies, cache, record, replay)
+        self.reviewer = Reviewer(filename, message_sender, jobs, pgn_path, cache, record, replay)
+
+    def __call__(self):
+        processors = [
+            (self.analyzer, self.analyzer.preprocess(INPUT_DIRECTORY, TACTICS_DIRECTORY)),
+            (self.reviewer, self.reviewer.preprocess(INPUT_DIRECTORY, REVIEWS_DIRECTORY)),
+        ]
+        processors = [(processor, data) for processor, data in processors if data is not None]
+
+        # results loaded from the records of both directories are not searched in this run
+        self.engine_record = EngineRecord()
+        for processor, _ in processors:
+            if processor.engine_record is not None:
+                self.engine_record.results.update(processor.engine_record.results)
+
+        for processor, data in processors:
+            processor.engine_record = self.engine_record
+            processor.replay = True
+            processor.process(data)
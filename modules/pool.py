@@ -0,0 +1,109 @@
+import queue as queues
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing import Manager
+from typing import Optional, Type
+
+from tqdm import tqdm
+
+from modules.metrics import Metrics, metrics, push_metrics
+from modules.processor import Processor
+from modules.server.client import QueueClient
+from modules.structures.message import Message
+from modules.structures.message_sender import MessageSender
+
+POLL_INTERVAL = 0.2
+
+
+def process_game(
+    processor_class: Type[Processor],
+    filename: str,
+    queue: queues.Queue,
+    id: str,
+    text: str,
+    options: dict,
+):
+    # a forked worker starts with a copy of values not pushed by the parent yet
+    metrics.reset()
+    processor = processor_class(
+        filename=filename,
+        message_sender=MessageSender(client=QueueClient(queue), id=id, text=text),
+        **options,
+    )
+    processor()
+    push_metrics(processor.message_sender.client)
+
+
+def forward_messages(queue: queues.Queue, message_sender: MessageSender):
+    """
+    Forward the last status message of workers to the status server, older ones are outdated already. Metrics of
+    workers are merged and pushed together.
+    """
+    last = None
+    while True:
+        try:
+            string = queue.get_nowait()
+        except queues.Empty:
+            break
+
+        worker_metrics = Metrics.decode(string)
+        if worker_metrics is not None:
+            metrics.merge(worker_metrics)
+        else:
+            last = string
+
+    if last is not None:
+        message = Message.decode(last)
+        message.text = message_sender.get_text()
+        message.analyzed = message_sender.analyzed
+        message.total = message_sender.total
+        message_sender.client.send(message.encode())
+
+    push_metrics(message_sender.client)
+
+
+def process_in_pool(
+    processor_class: Type[Processor],
+    filenames: list[str],
+    message_sender: MessageSender,
+    jobs: int,
+    options: Optional[dict] = None,
+    game_options: Optional[dict] = None,
+):
+    """
+    Process games in a pool of `jobs` processes. `options` are passed to every processor, and `game_options` maps
+    filenames to additional options of a single game.
+    """
+    options = {} if options is None else options
+    game_options = {} if game_options is None else game_options
+    with Manager() as manager:
+        queue = manager.Queue()
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        pending: set[Future] = {
+            executor.submit(
+                process_game,
+                processor_class,
+                filename,
+                queue,
+                message_sender.id,
+                message_sender.text,
+                {**options, **game_options.get(filename, {})},
+            )
+            for filename in filenames
+        }
+
+        try:
+            with tqdm(total=len(filenames)) as bar:
+                while pending:
+                    done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                        message_sender.analyzed += 1
+                        bar.update()
+
+                    forward_messages(queue, message_sender)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        # workers have to release the cache and records before the caller saves or merges them
+        executor.shutdown(wait=True)
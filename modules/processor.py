@@ -1,37 +1,111 @@
 import hashlib
 import os
+from typing import Optional, Union
 
 import chess.pgn
 
 from modules.converter import get_moves
+from modules.engine.engine import CACHE_ENABLED, STOCKFISH_RECORD
+from modules.engine.record import RECORD_FILENAME, EngineRecord
+from modules.pgn_index import get_pgn_index
 from modules.structures.message_sender import MessageSender
+from modules.structures.statistics import Statistics
 
 
 class Processor:
-    def __init__(self, filename: str, message_sender: MessageSender):
+    def __init__(
+        self,
+        filename: Union[str, int],
+        message_sender: MessageSender,
+        pgn_path: Optional[str] = None,
+        cache: bool = CACHE_ENABLED,
+        record: bool = STOCKFISH_RECORD,
+        replay: bool = False,
+    ):
+        """
+        `filename` is a game file in the input directory or, if `pgn_path` is given, a number of a game in the
+        indexed PGN file. `cache` disables the evaluation cache for this game when set to `False`.
+
+        With `record`, results of engine searches are saved in the output directory of the game. With `replay`, an
+        already processed game is processed again, searching only positions not found in its record.
+        """
         self.filename = filename
         self.message_sender = message_sender
+        self.pgn_path = pgn_path
+        self.cache = cache
+        self.record = record
+        self.replay = replay
+        self.engine_record: Optional[EngineRecord] = None
+        self.save_record = record or replay
+        self.statistics = Statistics()
+
+    def load_game(self, input_directory: str) -> tuple[list[str], chess.pgn.Game]:
+        if self.pgn_path is not None:
+            game = get_pgn_index(self.pgn_path).read_game(int(self.filename))
+            return [move.uci() for move in game.mainline_moves()], game
+
+        game_path = os.path.join(input_directory, self.filename)
+        return get_moves(game_path), chess.pgn.read_game(open(game_path))
+
+    def clear(self, directory: str):
+        """
+        Remove results of the previous processing of the game before it is replayed.
+        """
+
+    def save_engine_record(self, directory: str):
+        if self.engine_record is not None and self.save_record:
+            self.engine_record.save(directory)
+            print(self.engine_record)
+
+    def update_engine_record(self, results: dict):
+        if self.engine_record is not None:
+            self.engine_record.update(results)
+
+    def get_worker_record(self) -> Optional[EngineRecord]:
+        if self.engine_record is None:
+            return None
+
+        # workers need the recorded results only to replay them
+        return self.engine_record if self.replay else EngineRecord()
 
     @staticmethod
-    def preprocess(game_path: str, output_directory: str):
-        moves = get_moves(game_path)
-        game = chess.pgn.read_game(open(game_path))
+    def get_output_filename(game: chess.pgn.Game) -> str:
         game_hash = hashlib.md5(str(game).encode()).hexdigest()
         headers = game.headers
-        starting_position = headers.get("FEN")
-
-        output_filename = (
+        return (
             f"{headers.get('White', '_')} vs {headers.get('Black', '_')} ({headers.get('Date', '___')}) [{game_hash}]"
         )
+
+    def is_finished(self, directory: str) -> bool:
+        """
+        Whether the game with the output `directory` is already processed, and is not replayed.
+        """
+        if not os.path.isdir(directory) or os.path.exists(os.path.join(directory, ".progress")):
+            return False
+
+        return not self.replay or not os.path.exists(os.path.join(directory, RECORD_FILENAME))
+
+    def preprocess(self, input_directory: str, output_directory: str):
+        moves, game = self.load_game(input_directory)
+        headers = game.headers
+        starting_position = headers.get("FEN")
+
+        output_filename = self.get_output_filename(game)
         directory = os.path.join(output_directory, output_filename)
         in_progress_file = os.path.join(directory, ".progress")
+        if self.is_finished(directory):
+            print(f"Analysis for {output_filename} are already found.")
+            return
+
         if os.path.isdir(directory):
             if not os.path.exists(in_progress_file):
-                print(f"Analysis for {output_filename} are already found.")
-                return
+                self.clear(directory)
         else:
             os.mkdir(directory)
 
+        if self.record or self.replay:
+            self.engine_record = EngineRecord.load(directory)
+
         open(in_progress_file, "a").close()
         return (
             moves,
@@ -5,6 +5,8 @@ class Configuration(BaseModel):
     algorithm: dict
     review: dict
     stockfish: dict
+    analysis: dict
+    cache: dict
     paths: dict
     export: dict
     server: dict
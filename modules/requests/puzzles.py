@@ -0,0 +1,38 @@
+from typing import Optional
+
+from fastapi import Query
+from pydantic import BaseModel
+
+from modules.server.puzzle_index import PuzzleFilters
+
+
+class ProgressData(BaseModel):
+    values: dict[str, Optional[int]]
+
+
+def get_puzzle_filters(
+    puzzle_type: Optional[list[str]] = Query(None),
+    min_hardness: Optional[float] = None,
+    max_hardness: Optional[float] = None,
+    min_moves: Optional[int] = None,
+    max_moves: Optional[int] = None,
+    player: Optional[str] = None,
+    min_elo: Optional[int] = None,
+    max_elo: Optional[int] = None,
+    min_date: Optional[str] = None,
+    max_date: Optional[str] = None,
+    solved: Optional[bool] = None,
+) -> PuzzleFilters:
+    return PuzzleFilters(
+        puzzle_types=puzzle_type,
+        min_hardness=min_hardness,
+        max_hardness=max_hardness,
+        min_moves=min_moves,
+        max_moves=max_moves,
+        player=player,
+        min_elo=min_elo,
+        max_elo=max_elo,
+        min_date=min_date,
+        max_date=max_date,
+        solved=solved,
+    )
@@ -1,26 +1,34 @@
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from functools import partial
+from typing import Iterator, Optional, Union
 
-from chess import Board
-from stockfish import Stockfish
+from chess import Board, Move
 
 from modules.configuration import load_configuration
 from modules.converter import uci_to_san
+from modules.engine.engine import CACHE_ENABLED, STOCKFISH_RECORD, get_engine
+from modules.finder.auxiliary import get_evaluation_from_top_moves
+from modules.finder.parallel import initialize_worker, search_position
 from modules.json import json_save
+from modules.metrics import metrics
 from modules.processor import Processor
 from modules.reviewer.auxiliary import get_accuracy, get_win_difference
 from modules.structures.evaluation import Evaluation
+from modules.structures.message_sender import MessageSender
 from modules.structures.move_classification import MoveClassification
 from modules.structures.review import Review
 from modules.structures.reviewed_move import ReviewedMove
+from modules.structures.statistics import Statistics
 
 configuration = load_configuration()
 
 INPUT_DIRECTORY = configuration["paths"]["processed"]
 OUTPUT_DIRECTORY = configuration["paths"]["reviews"]
-STOCKFISH_PATH = configuration["paths"]["stockfish"]
 
 STOCKFISH_DEPTH = configuration["stockfish"]["depth"]
-STOCKFISH_PARAMETERS = configuration["stockfish"]["parameters"]
 STOCKFISH_TOP_MOVES = configuration["stockfish"]["top_moves"]
 
 BEST_MOVE_PAWN_TOLERANCE = configuration["review"]["best_move_centipawn_tolerance"] / 100
@@ -52,6 +60,74 @@ LOST_WINNING_POSITION = "Lost winning position."
 
 
 class Reviewer(Processor):
+    def __init__(
+        self,
+        filename: Union[str, int],
+        message_sender: MessageSender,
+        jobs: int = 1,
+        pgn_path: Optional[str] = None,
+        cache: bool = CACHE_ENABLED,
+        record: bool = STOCKFISH_RECORD,
+        replay: bool = False,
+    ):
+        super().__init__(filename, message_sender, pgn_path, cache, record, replay)
+        self.jobs = jobs
+
+    def search_positions(
+        self, moves: list[str], starting_position: Optional[str], stockfish_depth: int
+    ) -> Iterator[list[dict]]:
+        """
+        Yield top moves of the starting position and of the position after every move.
+        """
+        stockfish = get_engine(stockfish_depth, self.cache, self.engine_record, self.replay)
+        try:
+            if starting_position:
+                stockfish.set_fen_position(starting_position)
+
+            yield stockfish.get_top_moves(STOCKFISH_TOP_MOVES)
+            for move in moves:
+                stockfish.make_moves_from_current_position([move])
+                yield stockfish.get_top_moves(STOCKFISH_TOP_MOVES)
+        finally:
+            self.statistics.engine_searches = stockfish.searches
+            if stockfish.cache is not None:
+                print(stockfish.cache)
+            stockfish.close()
+
+    def search_positions_in_parallel(
+        self, moves: list[str], starting_position: Optional[str], stockfish_depth: int
+    ) -> Iterator[list[dict]]:
+        """
+        Like `search_positions`, but the positions are searched by a pool of engines, as they depend only on their
+        FEN. Results are yielded in the order of moves, so that moves can be classified while later positions are
+        still searched.
+        """
+        board = Board(starting_position) if starting_position else Board()
+        fens = [board.fen()]
+        for move in moves:
+            board.push_uci(move)
+            fens.append(board.fen())
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=initialize_worker,
+            initargs=(stockfish_depth, self.cache, self.get_worker_record(), self.replay),
+        )
+
+        try:
+            for result in executor.map(partial(search_position, num_top_moves=STOCKFISH_TOP_MOVES), fens):
+                self.statistics.engine_searches += result.searches
+                self.update_engine_record(result.record)
+                metrics.merge(result.metrics)
+                yield result.top_moves
+        except BaseException:
+            # also when the review stops early and closes the generator
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        # workers hold their cache until they exit, so the review continues only after they are finished
+        executor.shutdown(wait=True)
+
     def review_game(
         self,
         moves,
@@ -60,24 +136,35 @@ class Reviewer(Processor):
         output_filename,
         stockfish_depth: int = STOCKFISH_DEPTH,
     ) -> Review:
-        stockfish = Stockfish(path=STOCKFISH_PATH, depth=stockfish_depth, parameters=STOCKFISH_PARAMETERS)
+        self.statistics = Statistics(plies=len(moves), searched_plies=len(moves), positions=len(moves))
+        start = time.perf_counter()
 
-        if starting_position:
-            board = Board(starting_position)
-            stockfish.set_fen_position(starting_position)
-        else:
-            board = Board()
+        board = Board(starting_position) if starting_position else Board()
+        search_positions = self.search_positions_in_parallel if self.jobs > 1 else self.search_positions
+        with closing(search_positions(moves, starting_position, stockfish_depth)) as positions:
+            review = self.review_moves(moves, board, positions, output_filename, Review(headers=headers))
+
+        self.statistics.add_phase("review", time.perf_counter() - start)
+        return review
 
-        review = Review(headers=headers)
+    def review_moves(
+        self, moves: list[str], board: Board, positions: Iterator[list[dict]], output_filename: str, review: Review
+    ) -> Review:
+        """
+        Classify the moves in order, as a move classification depends on the classifications of the previous moves.
+        """
+        top_moves = next(positions)
         for idx, move in enumerate(moves):
             move_number = (idx + 1 - int(board.turn)) // 2 + 1
             white = board.turn
 
-            top_moves = stockfish.get_top_moves(STOCKFISH_TOP_MOVES)
             best_moves = [move["Move"] for move in top_moves]
             evaluations = [Evaluation.from_stockfish(move) for move in top_moves]
-            stockfish.make_moves_from_current_position([move])
-            evaluation = Evaluation.from_evaluation(stockfish.get_evaluation())
+            check = board.gives_check(Move.from_uci(move))
+
+            # every position is searched once: its best line is also the evaluation of the move leading to it
+            top_moves = next(positions)
+            evaluation = get_evaluation_from_top_moves(top_moves, check)
 
             move_classification = self.review_move(board.turn, move, evaluation, best_moves, evaluations, review.moves)
 
@@ -97,13 +184,14 @@ class Reviewer(Processor):
 
             move_string = f'{move_number}{"." if white else "..."} {board_move} {"   " if white else " "}'
             print(f"{move_string}\t{evaluation}")
+            metrics.increment("plies_total", processor="review")
 
             self.message_sender(
                 filename=output_filename,
                 fen=board.fen(),
                 move_string=move_string,
                 turn=board.turn,
-                evaluation=Evaluation.from_evaluation(stockfish.get_evaluation()),
+                evaluation=evaluation,
             )
 
         return review
@@ -246,12 +334,14 @@ class Reviewer(Processor):
         json_save(review.to_json(), review_path)
 
     def __call__(self, *args, **kwargs):
-        game_path = os.path.join(INPUT_DIRECTORY, self.filename)
-        data = self.preprocess(game_path, OUTPUT_DIRECTORY)
+        data = self.preprocess(INPUT_DIRECTORY, OUTPUT_DIRECTORY)
 
         if data is None:
             return
 
+        self.process(data)
+
+    def process(self, data: tuple):
         (
             moves,
             headers,
@@ -275,6 +365,9 @@ class Reviewer(Processor):
             print(f"Stockfish error: {error}")
         except KeyboardInterrupt:
             raise KeyboardInterrupt("interrupted")
+        finally:
+            self.save_engine_record(directory)
+            self.message_sender.flush()
 
         if review is not None and review.moves:
             self.save_review(review, directory)
@@ -1,9 +1,13 @@
 import os
+import threading
 from hashlib import md5
 from typing import Optional
 
 from modules.configuration import load_configuration
 from modules.json import json_load, json_save
+from modules.server.manifest import Manifest
+from modules.server.progress_store import ProgressStore
+from modules.server.puzzle_index import PuzzleIndex
 from modules.structures.review import Review
 from modules.structures.tactic import Tactic
 from modules.structures.variations import Variations
@@ -14,9 +18,12 @@ TACTICS_DIRECTORY = configuration["paths"]["tactics"]
 REVIEWS_DIRECTORY = configuration["paths"]["reviews"]
 GATHERED_PUZZLES_PATH = configuration["paths"]["gathered_puzzles"]
 GATHERED_REVIEWS_PATH = configuration["paths"]["gathered_reviews"]
+GATHERED_MANIFEST_PATH = configuration["paths"]["gathered_manifest"]
 PROGRESS_PATH = configuration["paths"]["progress"]
 
-HARD_PROGRESS = configuration["tactic_player"]["hard_progress"]
+refresh_lock = threading.Lock()
+progress_store = ProgressStore()
+puzzle_index = PuzzleIndex()
 
 
 def gather_variations_paths(directory: str = TACTICS_DIRECTORY) -> list[str]:
@@ -39,80 +46,77 @@ def gather_reviews_paths(directory: str = REVIEWS_DIRECTORY) -> list[str]:
     return paths
 
 
+def get_puzzle(path: str) -> dict:
+    tactic = Tactic.from_file(path)
+    white = (tactic.headers.get("White", "?"), tactic.headers.get("WhiteElo", "?"))
+    black = (tactic.headers.get("Black", "?"), tactic.headers.get("BlackElo", "?"))
+    date = tactic.headers.get("Date", "????.??.??")
+    actual_result = tactic.headers.get("Result", "*")
+
+    name = f"{white[0]} vs. {black[0]} ({date})"
+    moves = tactic.moves
+    hardness = tactic.hardness
+    puzzle_type = tactic.type
+    pgn = str(tactic.to_pgn())
+    initial_evaluation = tactic[0].evaluation
+    starting_evaluation = tactic[1].evaluation
+    final_evaluation = tactic.final_evaluation
+    white_to_move = tactic[1].color
+
+    return {
+        "name": name,
+        "puzzleType": puzzle_type,
+        "moves": moves,
+        "hardness": hardness,
+        "initialEvaluation": (str(initial_evaluation) if initial_evaluation else ""),
+        "startingEvaluation": (str(starting_evaluation) if starting_evaluation else ""),
+        "finalEvaluation": str(final_evaluation) if final_evaluation else "",
+        "pgn": pgn,
+        "white": white[0],
+        "whiteElo": white[1],
+        "black": black[0],
+        "blackElo": black[1],
+        "date": date,
+        "actualResult": actual_result,
+        "whiteToMove": white_to_move,
+        "verified": tactic.verified,
+        "path": path.replace(".tactic", ".pgn"),
+        "hash": md5(path.encode()).hexdigest(),
+    }
+
+
 def gather_puzzles(paths: list[str]) -> list[dict]:
-    puzzles = []
-    for path in paths:
-        tactic = Tactic.from_file(path)
-        white = (tactic.headers.get("White", "?"), tactic.headers.get("WhiteElo", "?"))
-        black = (tactic.headers.get("Black", "?"), tactic.headers.get("BlackElo", "?"))
-        date = tactic.headers.get("Date", "????.??.??")
-        actual_result = tactic.headers.get("Result", "*")
-
-        name = f"{white[0]} vs. {black[0]} ({date})"
-        moves = tactic.moves
-        hardness = tactic.hardness
-        puzzle_type = tactic.type
-        pgn = str(tactic.to_pgn())
-        initial_evaluation = tactic[0].evaluation
-        starting_evaluation = tactic[1].evaluation
-        final_evaluation = tactic.final_evaluation
-        white_to_move = tactic[1].color
-
-        puzzles.append(
-            {
-                "name": name,
-                "puzzleType": puzzle_type,
-                "moves": moves,
-                "hardness": hardness,
-                "initialEvaluation": (str(initial_evaluation) if initial_evaluation else ""),
-                "startingEvaluation": (str(starting_evaluation) if starting_evaluation else ""),
-                "finalEvaluation": str(final_evaluation) if final_evaluation else "",
-                "pgn": pgn,
-                "white": white[0],
-                "whiteElo": white[1],
-                "black": black[0],
-                "blackElo": black[1],
-                "date": date,
-                "actualResult": actual_result,
-                "whiteToMove": white_to_move,
-                "path": path.replace(".tactic", ".pgn"),
-                "hash": md5(path.encode()).hexdigest(),
-            }
-        )
-
-    return puzzles
+    return [get_puzzle(path) for path in paths]
+
+
+def get_review(path: str) -> dict:
+    review = Review.from_file(path)
+    white = (review.headers.get("White", "?"), review.headers.get("WhiteElo", "?"))
+    black = (review.headers.get("Black", "?"), review.headers.get("BlackElo", "?"))
+    date = review.headers.get("Date", "????.??.??")
+    actual_result = review.headers.get("Result", "*")
+
+    name = f"{white[0]} vs. {black[0]} ({date})"
+    moves = [move.to_json() for move in review.moves]
+    pgn = str(review.to_pgn())
+
+    return {
+        "name": name,
+        "moves": moves,
+        "pgn": pgn,
+        "white": white[0],
+        "whiteElo": white[1],
+        "black": black[0],
+        "blackElo": black[1],
+        "date": date,
+        "actualResult": actual_result,
+        "path": path.replace(".rev", ".json"),
+        "hash": md5(path.encode()).hexdigest(),
+    }
 
 
 def gather_reviews(paths: list[str]) -> list[dict]:
-    reviews = []
-    for path in paths:
-        review = Review.from_file(path)
-        white = (review.headers.get("White", "?"), review.headers.get("WhiteElo", "?"))
-        black = (review.headers.get("Black", "?"), review.headers.get("BlackElo", "?"))
-        date = review.headers.get("Date", "????.??.??")
-        actual_result = review.headers.get("Result", "*")
-
-        name = f"{white[0]} vs. {black[0]} ({date})"
-        moves = [move.to_json() for move in review.moves]
-        pgn = str(review.to_pgn())
-
-        reviews.append(
-            {
-                "name": name,
-                "moves": moves,
-                "pgn": pgn,
-                "white": white[0],
-                "whiteElo": white[1],
-                "black": black[0],
-                "blackElo": black[1],
-                "date": date,
-                "actualResult": actual_result,
-                "path": path.replace(".rev", ".json"),
-                "hash": md5(path.encode()).hexdigest(),
-            }
-        )
-
-    return reviews
+    return [get_review(path) for path in paths]
 
 
 def rewrite_variations_and_tactics(paths: list[str]) -> None:
@@ -135,21 +139,29 @@ def save_puzzles(puzzles: list[dict], path: str = GATHERED_PUZZLES_PATH) -> None
     json_save(puzzles, path)
 
 
+def import_progress(logger: Optional[callable] = print):
+    progress_store.import_json(PROGRESS_PATH, logger)
+
+
+def load_progress() -> dict[str, int]:
+    return progress_store.get_all()
+
+
+def update_progress(values: dict[str, Optional[int]], logger: Optional[callable] = print) -> dict[str, Optional[int]]:
+    return progress_store.update(values, logger)
+
+
+def clear_progress(logger: Optional[callable] = print):
+    progress_store.clear()
+    logger("Progress cleared.")
+
+
 def save_progress(
     logger: Optional[callable] = print,
     puzzle_id: str = None,
     value: Optional[int] = None,
 ):
-    progress = {}
-    if os.path.exists(PROGRESS_PATH):
-        progress = json_load(PROGRESS_PATH)
-
-    if puzzle_id and value is not None and (not HARD_PROGRESS or puzzle_id not in progress):
-        progress[puzzle_id] = value
-        logger(f"Key {puzzle_id} stored as {value}.")
-
-    json_save(progress, PROGRESS_PATH)
-    return progress.get(puzzle_id)
+    return update_progress({puzzle_id: value}, logger).get(puzzle_id) if puzzle_id else None
 
 
 def save_reviews(reviews: list[dict], path: str = GATHERED_REVIEWS_PATH) -> None:
@@ -168,23 +180,44 @@ def refresh(
     gather_games: bool = False,
     rewrite: bool = False,
 ):
-    if not os.path.exists(GATHERED_PUZZLES_PATH) or gather_games:
-        logger("Gathering games...")
-        paths = gather_variations_paths()
-        if rewrite:
-            logger("Recalculating tactics...")
-            rewrite_variations_and_tactics(paths)
-
-        paths = [path.replace(".vars", ".tactic") for path in paths]
-        puzzles = gather_puzzles(paths)
-        save_puzzles(puzzles)
-        logger(f"Puzzle saved to {GATHERED_PUZZLES_PATH}")
-
-    if not os.path.exists(GATHERED_REVIEWS_PATH) or gather_games:
-        logger("Gathering reviews...")
-        paths = gather_reviews_paths()
-        reviews = gather_reviews(paths)
-        save_reviews(reviews)
-        logger(f"Reviews saved to {GATHERED_PUZZLES_PATH}")
-
-    save_progress(logger)
+    """
+    Gather puzzles and reviews. Only files which are new or changed since the last refresh are read, see `Manifest`.
+    """
+    with refresh_lock:
+        manifest = Manifest.load(GATHERED_MANIFEST_PATH)
+
+        if not os.path.exists(GATHERED_PUZZLES_PATH) or gather_games:
+            logger("Gathering games...")
+            paths = gather_variations_paths()
+            if rewrite:
+                logger("Recalculating tactics...")
+                rewrite_variations_and_tactics(paths)
+
+            paths = [path.replace(".vars", ".tactic") for path in paths]
+            puzzles, changed, removed = manifest.update("puzzles", paths, get_puzzle)
+            if changed or removed or not os.path.exists(GATHERED_PUZZLES_PATH):
+                save_puzzles(puzzles)
+                logger(f"Puzzle saved to {GATHERED_PUZZLES_PATH}")
+
+            hashes = {puzzle["hash"] for puzzle in puzzles}
+            if changed or removed:
+                # a removed puzzle may still be gathered from another file
+                puzzle_index.update(changed, [puzzle["hash"] for puzzle in removed if puzzle["hash"] not in hashes])
+                logger(f"{len(changed)} puzzles indexed, {len(removed)} removed.")
+
+            if len(puzzle_index) != len(hashes):
+                # the index was not updated with the manifest, like when its database is new
+                puzzle_index.replace(puzzles)
+                logger(f"{len(puzzles)} puzzles indexed.")
+        elif not len(puzzle_index):
+            puzzle_index.replace(json_load(GATHERED_PUZZLES_PATH))
+
+        if not os.path.exists(GATHERED_REVIEWS_PATH) or gather_games:
+            logger("Gathering reviews...")
+            paths = gather_reviews_paths()
+            reviews, changed, removed = manifest.update("reviews", paths, get_review)
+            if changed or removed or not os.path.exists(GATHERED_REVIEWS_PATH):
+                save_reviews(reviews)
+                logger(f"Reviews saved to {GATHERED_REVIEWS_PATH}")
+
+        manifest.save(GATHERED_MANIFEST_PATH)
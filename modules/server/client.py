@@ -8,3 +8,14 @@ class DummyClient:
 
     def close(self):
         pass
+
+
+class QueueClient:
+    def __init__(self, queue):
+        self.queue = queue
+
+    def send(self, message: str):
+        self.queue.put(message)
+
+    def close(self):
+        pass
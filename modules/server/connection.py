@@ -1,5 +1,7 @@
+import os
+import urllib.parse
 from multiprocessing.connection import Client, Listener
-from typing import Union
+from typing import Optional, Union
 
 from modules.configuration import load_configuration
 from modules.server.client import DummyClient
@@ -8,12 +10,40 @@ configuration = load_configuration()
 PORT = configuration["server"].get("listener_port", 6000)
 
 
+# scripts run by the scheduler get the id of their job, so that the status server tracks them under the same id
+JOB_ID_VARIABLE = "TACTIC_FINDER_JOB_ID"
+JOB_ID_KEY = "job_id"
+
+
+def get_job_id() -> Optional[str]:
+    return os.environ.get(JOB_ID_VARIABLE) or None
+
+
+def encode_job_id(job_id: str) -> str:
+    return urllib.parse.urlencode({JOB_ID_KEY: job_id})
+
+
+def decode_job_id(string: str) -> Optional[str]:
+    """
+    Return the job id announced by a client, or `None` if it is another message.
+    """
+    if not string.startswith(f"{JOB_ID_KEY}="):
+        return None
+
+    return urllib.parse.parse_qs(string)[JOB_ID_KEY][0]
+
+
 def get_client() -> Union[DummyClient, Client]:
     client = DummyClient(display=False)
     try:
         client = Client(("localhost", PORT), authkey=b"tactic")
     except EOFError:
         print("Server is off.")
+        return client
+
+    job_id = get_job_id()
+    if job_id is not None:
+        client.send(encode_job_id(job_id))
 
     return client
 
@@ -0,0 +1,68 @@
+import os
+import pickle
+from hashlib import md5
+from json import JSONDecodeError
+from typing import Callable
+
+from modules.json import json_load, json_save
+
+
+class Manifest:
+    """
+    Summaries of gathered files (puzzles or reviews) keyed by their paths, with modification times, sizes and content
+    hashes of the files. A refresh summarizes only new or changed files, and drops files which no longer exist.
+    """
+
+    def __init__(self, sections: dict[str, dict[str, dict]]):
+        self.sections = sections
+
+    @staticmethod
+    def get_hash(path: str) -> str:
+        with open(path, "rb") as file:
+            return md5(file.read()).hexdigest()
+
+    def update(
+        self, section: str, paths: list[str], summarize: Callable[[str], dict]
+    ) -> tuple[list[dict], list[dict], list[dict]]:
+        """
+        Return summaries of the files in the order of `paths`, summaries of new or changed files, and previous summaries
+        of changed or removed files.
+        """
+        entries = self.sections.get(section, {})
+        updated = {}
+        changed = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                entry = entries.get(path)
+                if entry is None or entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                    content_hash = self.get_hash(path)
+                    if entry is None or entry["hash"] != content_hash:
+                        entry = {"summary": summarize(path)}
+                        changed.append(entry["summary"])
+
+                    entry.update(mtime=stat.st_mtime_ns, size=stat.st_size, hash=content_hash)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                # the file is being written, so it is gathered by the next refresh
+                continue
+
+            updated[path] = entry
+
+        # entries replaced by summaries of changed files, or of files no longer gathered
+        removed = [entry["summary"] for path, entry in entries.items() if updated.get(path) is not entry]
+        self.sections[section] = updated
+        return [entry["summary"] for entry in updated.values()], changed, removed
+
+    def save(self, path: str):
+        json_save(self.sections, path, indent=None)
+
+    @staticmethod
+    def load(path: str) -> "Manifest":
+        if not os.path.exists(path):
+            return Manifest({})
+
+        try:
+            return Manifest(json_load(path))
+        except JSONDecodeError:
+            print(f"Corrupted manifest {path}, gathering all files again.")
+            return Manifest({})
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import threading
+from json import JSONDecodeError
+from typing import Optional
+
+from modules.configuration import load_configuration
+from modules.json import json_load
+
+configuration = load_configuration()
+
+PROGRESS_STORE_PATH = configuration["paths"]["progress_store"]
+HARD_PROGRESS = configuration["tactic_player"]["hard_progress"]
+
+
+class ProgressStore:
+    """
+    Progress of puzzles (the number of correct moves keyed by puzzle hashes) in an SQLite database. A batch of values is
+    stored in a single transaction, so that a write costs only the stored rows and concurrent writes are not lost. With
+    `hard_progress`, the first value stored for a puzzle is kept.
+    """
+
+    def __init__(self, path: str = PROGRESS_STORE_PATH, hard_progress: bool = HARD_PROGRESS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.hard_progress = hard_progress
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.create_tables()
+
+    def create_tables(self):
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS progress (
+                    hash TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """
+            )
+            self.connection.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM progress").fetchone()[0]
+
+    def get_all(self) -> dict[str, int]:
+        with self.lock:
+            return dict(self.connection.execute("SELECT hash, value FROM progress").fetchall())
+
+    def get(self, puzzle_hash: str) -> Optional[int]:
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM progress WHERE hash = ?", (puzzle_hash,)).fetchone()
+
+        return None if row is None else row[0]
+
+    def update(self, values: dict[str, Optional[int]], logger: Optional[callable] = print) -> dict[str, Optional[int]]:
+        """
+        Store the values (skipping `None`) and return the values stored for their keys afterwards.
+        """
+        statement = (
+            "INSERT OR IGNORE INTO progress VALUES (?, ?)"
+            if self.hard_progress
+            else "INSERT OR REPLACE INTO progress VALUES (?, ?)"
+        )
+        with self.lock:
+            with self.connection:
+                for puzzle_hash, value in values.items():
+                    if value is not None and self.connection.execute(statement, (puzzle_hash, value)).rowcount:
+                        logger(f"Key {puzzle_hash} stored as {value}.")
+
+            stored = {}
+            for puzzle_hash in values:
+                row = self.connection.execute("SELECT value FROM progress WHERE hash = ?", (puzzle_hash,)).fetchone()
+                stored[puzzle_hash] = None if row is None else row[0]
+
+        return stored
+
+    def clear(self):
+        with self.lock:
+            with self.connection:
+                self.connection.execute("DELETE FROM progress")
+
+    def import_json(self, path: str, logger: Optional[callable] = print):
+        """
+        Import the progress saved as JSON by previous versions once, the file is renamed afterwards.
+        """
+        if not os.path.exists(path):
+            return
+
+        try:
+            values = json_load(path)
+        except JSONDecodeError:
+            logger(f"Corrupted progress {path}, not imported.")
+            return
+
+        self.update(values, lambda _: None)
+        os.replace(path, f"{path}.imported")
+        logger(f"Progress of {len(values)} puzzles imported from {path}.")
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,238 @@
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from modules.configuration import load_configuration
+
+configuration = load_configuration()
+
+PUZZLE_INDEX_PATH = configuration["paths"]["puzzle_index"]
+PROGRESS_STORE_PATH = configuration["paths"]["progress_store"]
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def get_elo(value: str) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class PuzzleFilters:
+    """
+    Filters of the puzzle query. The Elo range applies to the player to move in the puzzle, and `solved` selects
+    puzzles found (or not found) in the progress store.
+    """
+
+    puzzle_types: Optional[list[str]] = None
+    min_hardness: Optional[float] = None
+    max_hardness: Optional[float] = None
+    min_moves: Optional[int] = None
+    max_moves: Optional[int] = None
+    player: Optional[str] = None
+    min_elo: Optional[int] = None
+    max_elo: Optional[int] = None
+    min_date: Optional[str] = None
+    max_date: Optional[str] = None
+    solved: Optional[bool] = None
+
+    def get_condition(self) -> tuple[str, list]:
+        conditions, parameters = ["1"], []
+        if self.puzzle_types is not None:
+            conditions.append("puzzle_type IN (SELECT value FROM json_each(?))")
+            parameters.append(json.dumps(self.puzzle_types))
+
+        for column, operator, value in [
+            ("hardness", ">=", self.min_hardness),
+            ("hardness", "<=", self.max_hardness),
+            ("moves", ">=", self.min_moves),
+            ("moves", "<=", self.max_moves),
+            ("elo", ">=", self.min_elo),
+            ("elo", "<=", self.max_elo),
+            ("date", ">=", self.min_date),
+            ("date", "<=", self.max_date),
+        ]:
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                parameters.append(value)
+
+        if self.player is not None:
+            conditions.append("(white = ? COLLATE NOCASE OR black = ? COLLATE NOCASE)")
+            parameters.extend([self.player, self.player])
+
+        if self.solved is not None:
+            negation = "" if self.solved else "NOT "
+            conditions.append(f"hash {negation}IN (SELECT hash FROM progress_store.progress)")
+
+        return " AND ".join(conditions), parameters
+
+
+class PuzzleIndex:
+    """
+    Gathered puzzles in an SQLite database, queried by filters in pages ordered by puzzle hashes. A page is continued
+    after the last hash of the previous one, so its cost does not depend on the number of preceding pages. Summaries
+    are returned without the PGN, which is fetched with the details of a single puzzle.
+
+    The database of a `ProgressStore`, which has to be created first, is attached as `progress_store`, so that puzzles
+    are filtered by the progress and joined with it without loading it.
+    """
+
+    def __init__(self, path: str = PUZZLE_INDEX_PATH, progress_path: str = PROGRESS_STORE_PATH):
+        for database_path in [path, progress_path]:
+            directory = os.path.dirname(database_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.connection.execute("ATTACH DATABASE ? AS progress_store", (progress_path,))
+        self.lock = threading.Lock()
+        self.create_tables()
+
+    def create_tables(self):
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS puzzles (
+                    hash TEXT PRIMARY KEY,
+                    puzzle_type TEXT NOT NULL,
+                    hardness REAL NOT NULL,
+                    moves INTEGER NOT NULL,
+                    white TEXT NOT NULL,
+                    black TEXT NOT NULL,
+                    elo INTEGER,
+                    date TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    pgn TEXT NOT NULL
+                )
+            """
+            )
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_type_hardness ON puzzles (puzzle_type, hardness)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_white ON puzzles (white COLLATE NOCASE)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_black ON puzzles (black COLLATE NOCASE)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_elo ON puzzles (elo)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_date ON puzzles (date)")
+            self.connection.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM puzzles").fetchone()[0]
+
+    @staticmethod
+    def get_row(puzzle: dict) -> tuple:
+        summary = {key: value for key, value in puzzle.items() if key != "pgn"}
+        elo = puzzle["whiteElo"] if puzzle["whiteToMove"] else puzzle["blackElo"]
+        return (
+            puzzle["hash"],
+            puzzle["puzzleType"],
+            puzzle["hardness"],
+            puzzle["moves"],
+            puzzle["white"],
+            puzzle["black"],
+            get_elo(elo),
+            puzzle["date"],
+            json.dumps(summary),
+            puzzle["pgn"],
+        )
+
+    def replace(self, puzzles: list[dict]):
+        """
+        Index all puzzles again, when the index is not in sync with the gathered puzzles.
+        """
+        with self.lock:
+            with self.connection:
+                self.connection.execute("DELETE FROM puzzles")
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO puzzles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [self.get_row(puzzle) for puzzle in puzzles],
+                )
+
+    def update(self, puzzles: list[dict], removed: list[str]):
+        """
+        Delete puzzles with `removed` hashes, then insert new and replace changed `puzzles` in a single transaction.
+        """
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    "DELETE FROM puzzles WHERE hash = ?", [(puzzle_hash,) for puzzle_hash in removed]
+                )
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO puzzles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [self.get_row(puzzle) for puzzle in puzzles],
+                )
+
+    def query(
+        self,
+        filters: PuzzleFilters,
+        after: Optional[str] = None,
+        limit: int = PAGE_SIZE,
+    ) -> dict:
+        """
+        Return a page of puzzle summaries matching the filters, the hash to continue after (`None` on the last page)
+        and the number of all matching puzzles.
+        """
+        condition, parameters = filters.get_condition()
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        with self.lock:
+            total = self.connection.execute(f"SELECT COUNT(*) FROM puzzles WHERE {condition}", parameters).fetchone()[0]
+            rows = self.connection.execute(
+                f"SELECT hash, summary FROM puzzles WHERE {condition} AND hash > ? ORDER BY hash LIMIT ?",
+                parameters + [after or "", limit + 1],
+            ).fetchall()
+
+        return {
+            "puzzles": [json.loads(summary) for _, summary in rows[:limit]],
+            "next": rows[limit - 1][0] if len(rows) > limit else None,
+            "total": total,
+        }
+
+    def get_random(self, filters: PuzzleFilters) -> Optional[dict]:
+        condition, parameters = filters.get_condition()
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT summary FROM puzzles WHERE {condition} ORDER BY random() LIMIT 1", parameters
+            ).fetchone()
+
+        return None if row is None else json.loads(row[0])
+
+    def get(self, puzzle_hash: str) -> Optional[dict]:
+        with self.lock:
+            row = self.connection.execute("SELECT summary, pgn FROM puzzles WHERE hash = ?", (puzzle_hash,)).fetchone()
+
+        if row is None:
+            return None
+
+        return {**json.loads(row[0]), "pgn": row[1]}
+
+    def get_statistics(self) -> dict:
+        """
+        Return the number of puzzles, and the numbers of solved puzzles and their moves found in the progress, in
+        total and solved correctly.
+        """
+        with self.lock:
+            puzzles = self.connection.execute("SELECT COUNT(*) FROM puzzles").fetchone()[0]
+            solved, correct, moves, correct_moves = self.connection.execute(
+                """
+                SELECT COUNT(*), COALESCE(SUM(progress.value >= puzzles.moves), 0),
+                    COALESCE(SUM(puzzles.moves), 0), COALESCE(SUM(progress.value), 0)
+                FROM progress_store.progress AS progress JOIN puzzles ON puzzles.hash = progress.hash
+            """
+            ).fetchone()
+
+        return {
+            "puzzles": puzzles,
+            "solved": solved,
+            "correct": correct,
+            "moves": moves,
+            "correctMoves": correct_moves,
+        }
+
+    def close(self):
+        self.connection.close()
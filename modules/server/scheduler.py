@@ -0,0 +1,291 @@
+import os
+import platform
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+from modules.configuration import load_configuration
+from modules.server.connection import JOB_ID_VARIABLE
+
+configuration = load_configuration()
+
+JOBS_PATH = configuration["paths"]["jobs"]
+JOB_FILES_DIRECTORY = configuration["paths"]["job_files"]
+WORKERS = configuration["server"]["workers"]
+STOCKFISH_JOBS = configuration["stockfish"]["jobs"]
+STOCKFISH_THREADS = configuration["stockfish"]["parameters"]["Threads"]
+
+SCRIPTS = ["analyze", "review", "analyze_and_review", "endgame"]
+PGN_SCRIPTS = ["analyze", "review", "analyze_and_review"]
+INTERACTIVE_PRIORITY = 0
+BULK_PRIORITY = 1
+POLL_INTERVAL = 1.0
+
+WINDOWS = platform.system() == "Windows"
+
+
+def get_workers() -> int:
+    """
+    The number of jobs run at once, by default as many as the engines of every job fit into the processors.
+    """
+    if WORKERS is not None:
+        return max(1, WORKERS)
+
+    return max(1, (os.cpu_count() or 1) // max(1, STOCKFISH_JOBS * STOCKFISH_THREADS))
+
+
+def get_command(script: str, argument: str) -> list[str]:
+    # games are read through an index of their own PGN file, so concurrent jobs do not share the processed directory
+    command = [sys.executable, f"{script}.py", argument]
+    return command + ["--index"] if script in PGN_SCRIPTS else command
+
+
+class Scheduler:
+    """
+    Persistent queue of analyses, reviews and endgame generations, run as headless processes by a pool of
+    `get_workers()` workers. Queued jobs are started in the order of their priorities (lower first) and then of their
+    submission. Jobs running when the server stops are queued again, and resume from the progress saved by the scripts
+    when the server starts again.
+    """
+
+    def __init__(self, path: str = JOBS_PATH, directory: str = JOB_FILES_DIRECTORY, workers: Optional[int] = None):
+        database_directory = os.path.dirname(path)
+        if database_directory:
+            os.makedirs(database_directory, exist_ok=True)
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.workers = get_workers() if workers is None else workers
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.condition = threading.Condition(self.lock)
+        self.processes: dict[int, subprocess.Popen] = {}
+        self.cancelled: set[int] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._running = threading.Event()
+        self.create_tables()
+
+    def create_tables(self):
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    script TEXT NOT NULL,
+                    argument TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    state TEXT NOT NULL,
+                    submitted REAL NOT NULL,
+                    started REAL,
+                    finished REAL,
+                    exit_code INTEGER
+                )
+            """
+            )
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_state_priority ON jobs (state, priority, id)")
+            self.connection.commit()
+
+    def get_pgn_path(self, job_id: int) -> str:
+        return os.path.join(self.directory, f"{job_id}.pgn")
+
+    def get_log_path(self, job_id: int) -> str:
+        return os.path.join(self.directory, f"{job_id}.log")
+
+    def submit(self, script: str, argument: str = "", priority: int = BULK_PRIORITY, pgn: Optional[str] = None) -> dict:
+        """
+        Queue a script. A PGN is saved as the input of its job, and passed to the script instead of `argument`.
+        """
+        if script not in SCRIPTS:
+            raise ValueError(f"Unknown script {script}")
+
+        with self.condition:
+            with self.connection:
+                job_id = self.connection.execute(
+                    "INSERT INTO jobs (script, argument, priority, state, submitted) VALUES (?, ?, ?, 'queued', ?)",
+                    (script, argument, priority, time.time()),
+                ).lastrowid
+
+                if pgn is not None:
+                    argument = self.get_pgn_path(job_id)
+                    with open(argument, "w") as file:
+                        file.write(pgn)
+
+                    self.connection.execute("UPDATE jobs SET argument = ? WHERE id = ?", (argument, job_id))
+
+            self.condition.notify()
+            return self.get_job(job_id)
+
+    def get_job(self, job_id: int) -> Optional[dict]:
+        with self.lock:
+            cursor = self.connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+
+            return dict(zip([column[0] for column in cursor.description], row))
+
+    def get_jobs(self, states: Optional[list[str]] = None) -> list[dict]:
+        with self.lock:
+            cursor = self.connection.execute("SELECT * FROM jobs ORDER BY id")
+            columns = [column[0] for column in cursor.description]
+            jobs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        return jobs if states is None else [job for job in jobs if job["state"] in states]
+
+    def set_state(self, job_id: int, state: str, **values):
+        assignments = ", ".join(["state = ?"] + [f"{key} = ?" for key in values])
+        with self.lock:
+            with self.connection:
+                self.connection.execute(
+                    f"UPDATE jobs SET {assignments} WHERE id = ?", [state, *values.values(), job_id]
+                )
+
+    def signal(self, job_id: int, signal_number: int):
+        process = self.processes[job_id]
+        if WINDOWS:
+            process.terminate()
+        else:
+            os.killpg(process.pid, signal_number)
+
+    def cancel(self, job_id: int) -> Optional[dict]:
+        """
+        Cancel a queued or paused job, or interrupt a running one.
+        """
+        with self.condition:
+            job = self.get_job(job_id)
+            if job is None or job["state"] not in ("queued", "paused", "running"):
+                return job
+
+            if job_id in self.processes:
+                self.cancelled.add(job_id)
+                if job["state"] == "paused":
+                    self.signal(job_id, signal.SIGCONT)
+                # the script reports the interruption to the status server, as with Ctrl+C
+                self.signal(job_id, signal.SIGINT)
+            else:
+                self.set_state(job_id, "cancelled", finished=time.time())
+                self.remove_files(job)
+
+            return self.get_job(job_id)
+
+    def pause(self, job_id: int) -> Optional[dict]:
+        """
+        Hold a queued job, or suspend a running one (not on Windows), which keeps its worker.
+        """
+        with self.condition:
+            job = self.get_job(job_id)
+            if job is None or job["state"] not in ("queued", "running"):
+                return job
+
+            if job_id in self.processes:
+                if WINDOWS:
+                    raise ValueError("Running jobs cannot be paused on Windows")
+                self.signal(job_id, signal.SIGSTOP)
+
+            self.set_state(job_id, "paused")
+            return self.get_job(job_id)
+
+    def resume(self, job_id: int) -> Optional[dict]:
+        with self.condition:
+            job = self.get_job(job_id)
+            if job is None or job["state"] != "paused":
+                return job
+
+            if job_id in self.processes:
+                self.signal(job_id, signal.SIGCONT)
+                self.set_state(job_id, "running")
+            else:
+                self.set_state(job_id, "queued")
+                self.condition.notify()
+
+            return self.get_job(job_id)
+
+    def remove_files(self, job: dict):
+        if job["script"] in PGN_SCRIPTS and job["argument"] == self.get_pgn_path(job["id"]):
+            for path in [job["argument"], f"{job['argument']}.idx"]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def launch(self, job: dict):
+        options = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if WINDOWS else {"start_new_session": True}
+        with open(self.get_log_path(job["id"]), "a") as log:
+            process = subprocess.Popen(
+                get_command(job["script"], job["argument"]),
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                env={**os.environ, JOB_ID_VARIABLE: str(job["id"])},
+                **options,
+            )
+
+        self.processes[job["id"]] = process
+        self.set_state(job["id"], "running", started=time.time())
+        threading.Thread(target=self.wait, args=(job["id"], process), daemon=True).start()
+
+    def wait(self, job_id: int, process: subprocess.Popen):
+        exit_code = process.wait()
+        with self.condition:
+            del self.processes[job_id]
+            if not self._running.is_set():
+                # the job was queued again by `stop`
+                return
+
+            if job_id in self.cancelled:
+                self.cancelled.discard(job_id)
+                state = "cancelled"
+            else:
+                state = "completed" if exit_code == 0 else "failed"
+
+            self.set_state(job_id, state, finished=time.time(), exit_code=exit_code)
+            self.remove_files(self.get_job(job_id))
+            self.condition.notify()
+
+    def dispatch(self):
+        with self.condition:
+            while self._running.is_set():
+                while len(self.processes) < self.workers:
+                    row = self.connection.execute(
+                        "SELECT id FROM jobs WHERE state = 'queued' ORDER BY priority, id LIMIT 1"
+                    ).fetchone()
+                    if row is None:
+                        break
+
+                    job = self.get_job(row[0])
+                    try:
+                        self.launch(job)
+                    except OSError as error:
+                        print(f"Job {job['id']} failed to start: {error}")
+                        self.set_state(job["id"], "failed", finished=time.time())
+
+                self.condition.wait(POLL_INTERVAL)
+
+    def start(self):
+        if self._thread is None:
+            with self.lock:
+                with self.connection:
+                    # jobs interrupted by a previous shutdown start again, and resume where they stopped
+                    self.connection.execute("UPDATE jobs SET state = 'queued' WHERE state = 'running'")
+
+            self._running.set()
+            self._thread = threading.Thread(target=self.dispatch, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self.condition:
+            self._running.clear()
+            for job_id in list(self.processes):
+                job = self.get_job(job_id)
+                if job["state"] == "paused":
+                    self.signal(job_id, signal.SIGCONT)
+                else:
+                    self.set_state(job_id, "queued")
+
+                self.signal(job_id, signal.SIGINT)
+
+            self.condition.notify()
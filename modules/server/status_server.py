@@ -1,53 +1,137 @@
+import itertools
 import threading
-from multiprocessing.connection import Listener
+import time
+from multiprocessing.connection import Connection, Listener
 from typing import Optional
-from urllib import parse
 
-from modules.server.connection import get_listener
+from modules.metrics import Metrics, metrics
+from modules.server.connection import decode_job_id, get_listener
 from modules.singleton import Singleton
+from modules.structures.message import Message
 
 NO_ANALYSIS_MESSAGE = "No analysis in progress."
+MAX_FINISHED_JOBS = 5
+
+
+def get_state(text: str) -> Optional[str]:
+    if "completed" in text:
+        return "completed"
+    elif "interrupted" in text:
+        return "interrupted"
+    elif "Stockfish error" in text or "failed" in text:
+        return "failed"
+    return None
 
 
 class StatusServer(Singleton):
+    """
+    Status hub of analyses, reviews and generations. Every connected script is a job with its own state, which is
+    replaced by each message of the script. Scripts run by the scheduler are keyed by the ids of their scheduler jobs,
+    so a job started again after a restart replaces its previous state, and other scripts by `script-<number>`.
+    Finished jobs are kept until `MAX_FINISHED_JOBS` newer ones finish. `version` changes with every update, so that
+    clients are updated only when there is anything new.
+    """
+
     listener: Listener
-    message: str
+    jobs: dict[str, dict]
+    version: int
     _thread: Optional[threading.Thread]
     _running: threading.Event
 
     def init(self):
         self.listener = get_listener()
-        self.message = NO_ANALYSIS_MESSAGE
+        self.jobs = {}
+        self.version = 0
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
         self._thread = None
         self._running = threading.Event()
 
-    def communicate(self):
+    @property
+    def running(self) -> bool:
+        return self._running.is_set()
+
+    @property
+    def message(self) -> str:
+        """
+        The last message of the most recently updated job.
+        """
+        with self.lock:
+            if not self.jobs:
+                return NO_ANALYSIS_MESSAGE
+
+            job = max(self.jobs.values(), key=lambda state: state["updated"])
+            return job["message"]
+
+    def get_jobs(self) -> list[dict]:
+        with self.lock:
+            return [
+                {key: value for key, value in job.items() if key != "message"}
+                for job in sorted(self.jobs.values(), key=lambda state: state["started"])
+            ]
+
+    def update_job(self, job_id: str, message: str):
+        state = Message.decode(message).__dict__
+        with self.lock:
+            job = self.jobs.setdefault(job_id, {"id": job_id, "started": time.time()})
+            job.update(state, message=message, state=get_state(state["text"]) or "running", updated=time.time())
+            self.version += 1
+
+    def finish_job(self, job_id: str):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job["state"] == "running":
+                job["state"] = "interrupted"
+                self.version += 1
+
+            finished = [job for job in self.jobs.values() if job["state"] != "running"]
+            finished.sort(key=lambda state: state["updated"])
+            for job in finished[:-MAX_FINISHED_JOBS]:
+                del self.jobs[job["id"]]
+
+    def communicate(self, connection: Connection):
+        job_id = None
+        try:
+            while self._running.is_set():
+                message = connection.recv()
+                pushed_metrics = Metrics.decode(message)
+                if pushed_metrics is not None:
+                    metrics.merge(pushed_metrics)
+                    continue
+
+                announced_id = decode_job_id(message)
+                if announced_id is not None:
+                    job_id = announced_id
+                    continue
+
+                if job_id is None:
+                    job_id = f"script-{next(self._ids)}"
+
+                self.update_job(job_id, message)
+        except (EOFError, OSError, ConnectionError):
+            pass
+        finally:
+            connection.close()
+            if job_id is not None:
+                self.finish_job(job_id)
+
+    def accept(self):
         while self._running.is_set():
             try:
                 connection = self.listener.accept()
-                if not self._running.is_set():
-                    connection.close()
-                    break
-
-                while self._running.is_set():
-                    try:
-                        self.message = connection.recv()
-                        text = parse.parse_qsl(self.message)[0][1]
-                        if "completed" in text or "interrupted" in text or "Stockfish error" in text:
-                            connection.close()
-                            break
-                    except EOFError:
-                        self.message = NO_ANALYSIS_MESSAGE
-                        connection.close()
-                        break
             except (OSError, ConnectionError, ConnectionAbortedError):
-                self.message = NO_ANALYSIS_MESSAGE
                 break
 
+            if not self._running.is_set():
+                connection.close()
+                break
+
+            threading.Thread(target=self.communicate, args=(connection,), daemon=True).start()
+
     def start(self):
         if self._thread is None:
             self._running.set()
-            self._thread = threading.Thread(target=self.communicate, daemon=True)
+            self._thread = threading.Thread(target=self.accept, daemon=True)
             self._thread.start()
 
     def stop(self):
@@ -0,0 +1,43 @@
+import os
+import pickle
+from dataclasses import dataclass, field
+from typing import Optional
+
+from modules.picklable import Picklable
+from modules.structures.evaluation import Evaluation
+from modules.structures.visited_positions import VisitedPositions
+
+
+@dataclass
+class Checkpoint(Picklable):
+    """
+    State of an interrupted game analysis, stored in the `.progress` file of the game directory.
+
+    `ply` is the first ply which has not been analyzed yet, and `evaluation` is the evaluation before it.
+    """
+
+    ply: int = 0
+    evaluation: Optional[Evaluation] = None
+    visited: VisitedPositions = field(default_factory=VisitedPositions)
+    tactics: int = 0
+    early_rejections: int = 0
+    truncated: int = 0
+    triage_evaluations: Optional[list[Evaluation]] = None
+
+    def to_file(self, path: str):
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as file:
+            pickle.dump(self, file)
+
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def load(path: Optional[str]) -> "Checkpoint":
+        if path is None or not os.path.exists(path) or not os.path.getsize(path):
+            return Checkpoint()
+
+        try:
+            return Checkpoint.from_file(path)
+        except (pickle.UnpicklingError, EOFError, AttributeError):
+            print(f"Corrupted checkpoint {path}, starting from the beginning.")
+            return Checkpoint()
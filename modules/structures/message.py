@@ -15,3 +15,17 @@ class Message:
 
     def encode(self) -> str:
         return urllib.parse.urlencode(self.__dict__)
+
+    @staticmethod
+    def decode(string: str) -> "Message":
+        dictionary = dict(urllib.parse.parse_qsl(string, keep_blank_values=True))
+        return Message(
+            text=dictionary["text"],
+            analyzed=int(dictionary["analyzed"]),
+            total=int(dictionary["total"]),
+            game_name=dictionary.get("game_name", ""),
+            fen=dictionary.get("fen", ""),
+            last_move=dictionary.get("last_move", ""),
+            turn=dictionary.get("turn", "True") == "True",
+            evaluation=dictionary.get("evaluation", ""),
+        )
@@ -1,11 +1,18 @@
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from multiprocessing.connection import Client
-from typing import Union
+from typing import Optional, Union
 
+from modules.configuration import load_configuration
+from modules.metrics import push_metrics
 from modules.server.client import DummyClient
 from modules.structures.evaluation import Evaluation
 from modules.structures.message import Message
 
+configuration = load_configuration()
+
+STATUS_INTERVAL = configuration["server"]["status_interval"]
+
 
 @dataclass
 class MessageSender:
@@ -14,9 +21,11 @@ class MessageSender:
     text: str
     analyzed: int = 0
     total: int = 0
+    sent: float = field(default=0.0, repr=False)
+    pending: Optional[Message] = field(default=None, repr=False)
 
-    def __call__(self, filename: str, fen: str, move_string: str, turn: bool, evaluation: Evaluation):
-        text = "{name} {text} {items} of {total} games ({percent:.2f}%)...".format(
+    def get_text(self) -> str:
+        return "{name} {text} {items} of {total} games ({percent:.2f}%)...".format(
             name=self.id,
             text=self.text,
             items=self.analyzed,
@@ -24,8 +33,9 @@ class MessageSender:
             percent=100 * self.analyzed / self.total if self.total > 0 else 100,
         )
 
-        message = Message(
-            text=text,
+    def __call__(self, filename: str, fen: str, move_string: str, turn: bool, evaluation: Evaluation):
+        self.pending = Message(
+            text=self.get_text(),
             analyzed=self.analyzed,
             total=self.total,
             game_name=filename,
@@ -35,4 +45,18 @@ class MessageSender:
             evaluation=str(evaluation),
         )
 
-        self.client.send(message.encode())
+        # plies are processed faster than anybody can follow them, so the status is sent at a bounded rate
+        if time.monotonic() - self.sent >= STATUS_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """
+        Send the latest status held back by the rate limit, like the last ply of a game.
+        """
+        if self.pending is None:
+            return
+
+        self.client.send(self.pending.encode())
+        push_metrics(self.client)
+        self.pending = None
+        self.sent = time.monotonic()
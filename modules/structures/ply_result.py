@@ -0,0 +1,31 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+from modules.structures.evaluation import Evaluation
+from modules.structures.tactic import Tactic
+from modules.structures.variations import Variations
+from modules.structures.visited_positions import VisitedPositions
+
+
+@dataclass
+class PlyResult:
+    index: int
+    evaluation: Evaluation
+    variations: Optional[Variations] = None
+    tactic: Optional[Tactic] = None
+    visit_order: list[int] = field(default_factory=list)
+    early_rejections: int = 0
+    truncated: bool = False
+    searches: int = 0
+    metrics: dict = field(default_factory=dict)
+    record: dict = field(default_factory=dict)
+
+    def resolve_occurrences(self, visited: VisitedPositions):
+        for index, key in enumerate(self.visit_order):
+            if key in visited:
+                visited.update(self.visit_order[: index + 1], self.index)
+                self.variations = None
+                self.tactic = None
+                return
+
+        visited.update(self.visit_order, self.index)
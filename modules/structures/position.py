@@ -15,6 +15,7 @@ class Position:
     hard: bool = True
     material_balance: int = 0
     outcome: Optional[Outcome] = None
+    shallow: bool = False
 
     def __repr__(self):
         return self.move
@@ -1,12 +1,8 @@
-import base64
-import io
 from dataclasses import dataclass
 from typing import Optional
 
 import chess
-import matplotlib
 from chess.pgn import Headers
-from PIL import Image
 
 from modules.converter import create_game_from_board
 from modules.header import get_headers
@@ -15,6 +11,11 @@ from modules.structures.reviewed_move import ReviewedMove
 
 MAX_EVALUATION = 10.0
 
+CHART_WIDTH = 200
+CHART_PLY_HEIGHT = 20
+CHART_LIGHT_COLOR = "#f0d9b5"
+CHART_DARK_COLOR = "#b58863"
+
 
 @dataclass
 class Review(Picklable):
@@ -56,7 +57,7 @@ class Review(Picklable):
     def get_plot_values(self) -> tuple[list, list]:
         scales = []
         indices = []
-        for index, move in enumerate(self.moves):
+        for index, move in enumerate(self.moves or []):
             if isinstance(move.evaluation.value, int):
                 if move.evaluation.value == 0:
                     scale = 1.0 if move.turn else -1.0
@@ -71,28 +72,31 @@ class Review(Picklable):
 
         return indices, scales
 
-    def plot_evaluations(self):
-        matplotlib.use("Agg")
-        import matplotlib.pyplot as plt
-
+    def plot_evaluations(self, width: int = CHART_WIDTH, ply_height: int = CHART_PLY_HEIGHT) -> str:
+        """
+        Return an SVG chart of evaluations. Moves go from top to bottom, and the light area grows to the right as the
+        evaluation is better for White.
+        """
         indices, scales = self.get_plot_values()
-
-        fig = plt.figure(figsize=(len(indices) * 0.2, 2.0), facecolor="#b58863")
-        fig.subplots_adjust(left=0, bottom=0, right=1, top=1, wspace=0, hspace=0)
-        plt.fill_between(indices, scales, -1, color="#f0d9b5")
-        plt.axhline(y=0.0, color="gray", linestyle="-")
-
-        plt.axis("off")
-        plt.ylim([-1, 1])
-        plt.margins(x=0, y=0)
-
-        bytes_io = io.BytesIO()
-        plt.savefig(bytes_io, format="png")
-        pil_img = Image.open(bytes_io)
-        pil_img = pil_img.rotate(-90, expand=True)
-
-        bytes_io = io.BytesIO()
-        pil_img.save(bytes_io, format="png")
-
-        bytes_io.seek(0)
-        return base64.b64encode(bytes_io.read()).decode()
+        if indices:
+            height = len(indices) * ply_height
+            span = indices[-1] - indices[0] or 1.0
+
+            points = [(0.0, 0.0)]
+            for index, scale in zip(indices, scales):
+                points.append(((scale + 1) / 2 * width, (index - indices[0]) / span * height))
+            points.append((0.0, float(height)))
+        else:
+            # a game without moves is shown as a single ply of an equal position
+            height = ply_height
+            points = [(0.0, 0.0), (width / 2, 0.0), (width / 2, float(height)), (0.0, float(height))]
+
+        polygon = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}" preserveAspectRatio="none">'
+            f'<rect width="{width}" height="{height}" fill="{CHART_DARK_COLOR}"/>'
+            f'<polygon points="{polygon}" fill="{CHART_LIGHT_COLOR}"/>'
+            f'<line x1="{width / 2}" y1="0" x2="{width / 2}" y2="{height}" stroke="gray"/>'
+            "</svg>"
+        )
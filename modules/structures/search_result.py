@@ -0,0 +1,9 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SearchResult:
+    top_moves: list[dict]
+    searches: int = 0
+    metrics: dict = field(default_factory=dict)
+    record: dict = field(default_factory=dict)
@@ -0,0 +1,36 @@
+from dataclasses import asdict, dataclass, field
+
+
+@dataclass
+class Statistics:
+    """
+    Counters and timings of processing a single game.
+    """
+
+    plies: int = 0
+    searched_plies: int = 0
+    positions: int = 0
+    engine_searches: int = 0
+    early_rejections: int = 0
+    truncated: int = 0
+    phases: dict[str, float] = field(default_factory=dict)
+
+    def add_ply(self, positions: int, early_rejections: int, truncated: bool):
+        self.searched_plies += 1
+        self.positions += positions
+        self.early_rejections += early_rejections
+        self.truncated += truncated
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @property
+    def time(self) -> float:
+        return sum(self.phases.values())
+
+    def to_json(self) -> dict:
+        dictionary = asdict(self)
+        dictionary["time"] = self.time
+        dictionary["positions_per_second"] = self.positions / self.time if self.time else 0.0
+        dictionary["engine_searches_per_ply"] = self.engine_searches / self.plies if self.plies else 0.0
+        return dictionary
@@ -26,6 +26,7 @@ class Tactic(Picklable):
     positions: list[Position]
     headers: Optional[Headers] = None
     type: str = ""
+    verified: bool = True
 
     def __iter__(self):
         return self.positions.__iter__()
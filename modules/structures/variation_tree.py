@@ -0,0 +1,106 @@
+from array import array
+from typing import Optional
+
+from modules.structures.position import Position
+
+
+class VariationTree:
+    """
+    A tree of positions stored in parallel arrays.
+
+    Nodes are indices, the root has index 0. Nodes are added in the pre-order, so a parent always precedes its
+    children.
+    """
+
+    __slots__ = ("positions", "parents", "depths", "child_counts")
+
+    def __init__(self):
+        self.positions: list[Position] = []
+        self.parents: array = array("i")
+        self.depths: array = array("H")
+        self.child_counts: array = array("H")
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, index: int) -> Position:
+        return self.positions[index]
+
+    def __getstate__(self) -> tuple:
+        return self.positions, self.parents, self.depths, self.child_counts
+
+    def __setstate__(self, state: tuple):
+        self.positions, self.parents, self.depths, self.child_counts = state
+
+    @property
+    def root(self) -> Optional[Position]:
+        return self.positions[0] if self.positions else None
+
+    def add(self, position: Position, parent: int = -1) -> int:
+        index = len(self.positions)
+        self.positions.append(position)
+        self.parents.append(parent)
+        self.child_counts.append(0)
+        if parent < 0:
+            self.depths.append(0)
+        else:
+            self.depths.append(self.depths[parent] + 1)
+            self.child_counts[parent] += 1
+
+        return index
+
+    def has_children(self, index: int = 0) -> bool:
+        return index < len(self) and self.child_counts[index] > 0
+
+    def get_depth(self, index: int) -> int:
+        return self.depths[index]
+
+    def get_leaves(self) -> list[int]:
+        return [index for index, count in enumerate(self.child_counts) if count == 0]
+
+    def get_ancestors(self, index: int) -> list[int]:
+        ancestors = []
+        parent = self.parents[index]
+        while parent >= 0:
+            ancestors.append(parent)
+            parent = self.parents[parent]
+
+        return ancestors[::-1]
+
+    def get_history(self, index: int) -> list[Position]:
+        return [self.positions[ancestor] for ancestor in self.get_ancestors(index)] + [self.positions[index]]
+
+    def to_json(self) -> Optional[dict]:
+        nodes = []
+        for position, parent in zip(self.positions, self.parents):
+            node = {"name": position.to_json()}
+            nodes.append(node)
+            if parent >= 0:
+                nodes[parent].setdefault("children", []).append(node)
+
+        return nodes[0] if nodes else None
+
+    @staticmethod
+    def from_json(dictionary: dict) -> "VariationTree":
+        tree = VariationTree()
+        stack = [(dictionary, -1)]
+        while stack:
+            node, parent = stack.pop()
+            index = tree.add(Position.from_json(dict(node["name"])), parent)
+            stack.extend((child, index) for child in reversed(node.get("children", [])))
+
+        return tree
+
+    @staticmethod
+    def from_node(node) -> "VariationTree":
+        """
+        Convert an `anytree.Node` tree of positions, as stored in old `.vars` files.
+        """
+        tree = VariationTree()
+        stack = [(node, -1)]
+        while stack:
+            node, parent = stack.pop()
+            index = tree.add(node.name, parent)
+            stack.extend((child, index) for child in reversed(node.children))
+
+        return tree
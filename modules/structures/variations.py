@@ -1,34 +1,32 @@
-import json
-from copy import deepcopy
 from dataclasses import dataclass
 from typing import Optional
 
-from anytree import Node, PreOrderIter
-from anytree.exporter import JsonExporter
-from anytree.importer import JsonImporter
 from chess.pgn import Headers
 
 from modules.header import get_headers
 from modules.picklable import Picklable
-from modules.structures.position import Position
 from modules.structures.tactic import Tactic
-
-
-def get_node_history(node: Node) -> list[Position]:
-    history = [node.name for node in node.ancestors] + [node.name]
-    return history
+from modules.structures.variation_tree import VariationTree
 
 
 @dataclass
 class Variations(Picklable):
-    root: Node
+    tree: VariationTree
     headers: Optional[Headers] = None
+    verified: bool = True
+
+    def __setstate__(self, state: dict):
+        # old `.vars` files store an `anytree.Node` root instead of a tree
+        if "root" in state:
+            state["tree"] = VariationTree.from_node(state.pop("root"))
 
-    def get_resolved_leaves(self) -> list[Node]:
-        leaves = self.root.leaves
+        self.__dict__.update(state)
+
+    def get_resolved_leaves(self) -> list[int]:
+        leaves = self.tree.get_leaves()
         return sorted(
-            [leaf for leaf in leaves if leaf.name.outcome.type != "not resolved"],
-            key=lambda leaf: leaf.depth,
+            [leaf for leaf in leaves if self.tree[leaf].outcome.type != "not resolved"],
+            key=self.tree.get_depth,
             reverse=True,
         )
 
@@ -37,9 +35,10 @@ class Variations(Picklable):
         if resolved_leaves:
             return [
                 Tactic(
-                    get_node_history(leaf),
-                    type=leaf.name.outcome.description,
+                    self.tree.get_history(leaf),
+                    type=self.tree[leaf].outcome.description,
                     headers=self.headers,
+                    verified=self.verified,
                 )
                 for leaf in resolved_leaves
             ]
@@ -51,24 +50,14 @@ class Variations(Picklable):
             return tactics[0]
 
     def to_json(self) -> dict:
-        exporter = JsonExporter()
-        root = deepcopy(self.root)
-        for node in PreOrderIter(root):
-            if isinstance(node.name, Position):
-                node.name = node.name.to_json()
-
         return {
-            "root": json.loads(exporter.export(root)),
+            "root": self.tree.to_json(),
             "headers": self.headers.__dict__,
+            "verified": self.verified,
         }
 
     @staticmethod
     def from_json(dictionary: dict):
-        importer = JsonImporter()
-        root = importer.import_(json.dumps(dictionary["root"]))
-        for node in PreOrderIter(root):
-            if isinstance(node.name, dict):
-                node.name = Position.from_json(node.name)
-
+        tree = VariationTree.from_json(dictionary["root"])
         headers = get_headers(dictionary["headers"])
-        return Variations(root=root, headers=headers)
+        return Variations(tree=tree, headers=headers, verified=dictionary.get("verified", True))
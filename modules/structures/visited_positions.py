@@ -0,0 +1,28 @@
+from typing import Iterable
+
+
+class VisitedPositions:
+    """
+    Zobrist keys of positions visited in tactic trees of a game, together with the first ply they were visited at.
+    """
+
+    __slots__ = ("plies",)
+
+    def __init__(self):
+        self.plies: dict[int, int] = {}
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.plies
+
+    def __len__(self) -> int:
+        return len(self.plies)
+
+    def visit(self, key: int, ply: int = 0):
+        self.plies.setdefault(key, ply)
+
+    def update(self, keys: Iterable[int], ply: int = 0):
+        for key in keys:
+            self.plies.setdefault(key, ply)
+
+    def occurred_before(self, key: int, ply: int) -> bool:
+        return self.plies.get(key, ply) < ply
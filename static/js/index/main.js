@@ -32,6 +32,10 @@ $("#review").on("click", function () {
     run("review");
 });
 
+$("#analyze_and_review").on("click", function () {
+    run("analyze_and_review");
+});
+
 function initializeLogContainer() {
     const logContainer = document.getElementById("installation-log");
     logContainer.style.display = "block";
@@ -148,43 +152,66 @@ function clearGameDescription() {
     $("#move").html("&nbsp;");
 }
 
-function getState() {
-    $.ajax({
-        url: "/analysis_state",
-        type: "GET",
-        contentType: "application/json; charset=utf-8",
-        success: (data) => {
-            setInput(true);
-            if (Object.keys(data).length === 0) {
-                $("#analysis_state").html("No analysis in progress.");
-                setProgressVisibility(false);
-                board.clear();
-            } else {
-                $("#analysis_state").html(data["text"]);
-                $("#game_description").html(data["game_name"]);
-                setProgressVisibility(true);
-                setProgressBar(data["text"], data["analyzed"], data["total"]);
-
-                if (data["fen"] !== null && data["fen"] !== undefined) {
-                    board.setPosition(data["fen"]);
-                }
+function showState(data) {
+    $("#game_description").html(data["game_name"]);
+    setProgressVisibility(true);
+    setProgressBar(data["text"], data["analyzed"], data["total"]);
 
-                if (data["last_move"] !== null && data["last_move"] !== undefined && data["evaluation"] !== null) {
-                    $("#move").html(
-                        `${data["last_move"]}${data["evaluation"]}`,
-                    );
-                }
+    if (data["fen"] !== null && data["fen"] !== undefined && data["fen"] !== "") {
+        board.setPosition(data["fen"]);
+    }
 
-                evaluationBar.setEvaluation(data["evaluation"], data["turn"]);
-            }
-        },
-        error: () => {
+    if (data["last_move"] !== null && data["last_move"] !== undefined && data["evaluation"] !== null) {
+        $("#move").html(
+            `${data["last_move"]}${data["evaluation"]}`,
+        );
+    }
+
+    evaluationBar.setEvaluation(data["evaluation"], data["turn"]);
+}
+
+function showStates(jobs) {
+    if (jobs.length === 0) {
+        $("#analysis_state").html("No analysis in progress.");
+        setProgressVisibility(false);
+        board.clear();
+        return;
+    }
+
+    // texts of all jobs are listed, and the board follows the most recently updated one
+    $("#analysis_state").html(jobs.map((job) => job["text"]).join("<br>"));
+    const running = jobs.filter((job) => job["state"] === "running");
+    const candidates = running.length ? running : jobs;
+    showState(candidates.reduce((a, b) => (a["updated"] >= b["updated"] ? a : b)));
+}
+
+function watchStates() {
+    const eventSource = new EventSource("/analysis_state/stream");
+    let failure = null;
+
+    eventSource.onopen = function () {
+        clearTimeout(failure);
+        failure = null;
+        setInput(true);
+    };
+
+    eventSource.onmessage = function (event) {
+        showStates(JSON.parse(event.data));
+    };
+
+    eventSource.onerror = function () {
+        // the stream is renewed by the server from time to time, so only a failed reconnection is reported
+        if (failure !== null) {
+            return;
+        }
+
+        failure = setTimeout(() => {
             $("#analysis_state").html("Failed to connect to the server.");
             setProgressVisibility(false);
             setInput(false);
             board.clear();
-        },
-    });
+        }, 2000);
+    };
 }
 
 function fetchLayouts() {
@@ -291,7 +318,6 @@ if (generateButton !== null) {
     document.addEventListener("DOMContentLoaded", function() {
         fetchLayouts();
         loadConfiguration();
-        getState();
-        setInterval(getState, 1000);
+        watchStates();
     });
 }
@@ -196,7 +196,7 @@ function loadChart(path) {
         data: path,
         contentType: "text/plain; charset=utf-8",
         success: (data) => {
-            image = `data:image/png;base64,${data}`;
+            image = `data:image/svg+xml;charset=utf-8,${encodeURIComponent(data)}`;
             document.getElementById("evaluation_chart").src = image;
         },
         error: () => {
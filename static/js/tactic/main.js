@@ -37,10 +37,9 @@ const puzzlesLoaded = $.Deferred();
 let actionId = 0;
 
 let puzzles = null;
-let puzzlesPath = null;
-let filteredPuzzles = null;
+let nextPuzzle = null;
+let loadingPuzzles = false;
 let favorites = {};
-const hashes = {};
 const puzzlesHistory = new History();
 
 let tactic = null;
@@ -84,17 +83,13 @@ function delay(callback, time) {
 }
 
 function loadNextPuzzle() {
-    filterPuzzles();
-    if (filteredPuzzles === null) {
-        return;
-    } else if (!filteredPuzzles.length) {
-        return;
-    }
-
-    const puzzle =
-        filteredPuzzles[Math.floor(Math.random() * filteredPuzzles.length)];
-    const path = getPath(puzzle.path);
-    loadPGN(path, puzzle.hash);
+    fetch(`/puzzles/random?${getPuzzleQuery()}`, { cache: "no-cache" })
+        .then((response) => (response.ok ? response.json() : null))
+        .then((puzzle) => {
+            if (puzzle !== null) {
+                loadPGN(getPath(puzzle.path), puzzle.hash);
+            }
+        });
 }
 
 function loadPGN(path, puzzleId, addToHistory) {
@@ -120,31 +115,6 @@ function loadPGN(path, puzzleId, addToHistory) {
         });
 }
 
-function calculateSuccessRate() {
-    if (puzzles === null || progress.container === null || hashes === null) {
-        return [0, 0, 0.0];
-    }
-
-    let correct = 0;
-    let total = 0;
-    for (const [hash, correctMoves] of Object.entries(progress.container)) {
-        const puzzle = puzzles[hashes[hash]];
-        if (puzzle !== null && puzzle !== undefined) {
-            if (hardEvaluation) {
-                total += 1;
-                if (correctMoves >= puzzle.moves) {
-                    correct += 1;
-                }
-            } else {
-                total += puzzle.moves;
-                correct += correctMoves;
-            }
-        }
-    }
-
-    return [correct, total, total > 0 ? correct / total : 0.0];
-}
-
 function makeMove(move, instant) {
     if (move !== null && move !== undefined) {
         board.clearSquaresColors();
@@ -475,9 +445,10 @@ $("#progressClear").on("click", function () {
             "Are you sure you want to clear the progress? This cannot be undone.",
         )
     ) {
-        progress.clear();
-        updateSolvedStates();
-        updateSuccessRate();
+        progress.clear().always(() => {
+            filterPuzzles();
+            updateSuccessRate();
+        });
     }
 });
 
@@ -571,10 +542,11 @@ function readProgress(file) {
         const data = JSON.parse(event.target.result);
         if (data !== null) {
             try {
-                progress.update(data);
-                updateSolvedStates();
-                updateSuccessRate();
-                alert("Progress imported successfully.");
+                progress.update(data).always(() => {
+                    filterPuzzles();
+                    updateSuccessRate();
+                    alert("Progress imported successfully.");
+                });
             } catch (error) {
                 console.error(error);
             }
@@ -582,19 +554,26 @@ function readProgress(file) {
     };
 }
 
-function updateNumberOfPuzzles() {
-    if (puzzles !== null) {
-        const numberOfPuzzles = Object.keys(puzzles).length;
-        const numberOfPuzzlesText = `${numberOfPuzzles} puzzles in total.`;
-        $("#number_of_puzzles").html(numberOfPuzzlesText);
-    }
+function updateNumberOfPuzzles(numberOfPuzzles) {
+    const numberOfPuzzlesText = `${numberOfPuzzles} puzzles in total.`;
+    $("#number_of_puzzles").html(numberOfPuzzlesText);
 }
 
 function updateSuccessRate() {
-    const [correct, total, r] = calculateSuccessRate();
-    const rate = parseFloat(100 * r).toFixed(2);
-    const successRateText = `Success rate: ${correct}/${total} (${rate}%).`;
-    $("#success_rate").html(successRateText);
+    fetch("/puzzles/statistics", { cache: "no-cache" })
+        .then((response) => response.json())
+        .then((statistics) => {
+            const correct = hardEvaluation
+                ? statistics.correct
+                : statistics.correctMoves;
+            const total = hardEvaluation
+                ? statistics.solved
+                : statistics.moves;
+            const r = total > 0 ? correct / total : 0.0;
+            const rate = parseFloat(100 * r).toFixed(2);
+            const successRateText = `Success rate: ${correct}/${total} (${rate}%).`;
+            $("#success_rate").html(successRateText);
+        });
 }
 
 function updateSolvedStatus(hash, value, moves) {
@@ -609,12 +588,14 @@ function updateSolvedStatus(hash, value, moves) {
 }
 
 function updateSolvedStates() {
+    if (puzzles === null) {
+        return;
+    }
+
     for (const hash in progress.container) {
-        const value = progress.get(hash);
-        const index = hashes[hash];
-        if (index in puzzles) {
-            const moves = puzzles[index].moves;
-            updateSolvedStatus(hash, value, moves);
+        if (hash in puzzles) {
+            const moves = puzzles[hash].moves;
+            updateSolvedStatus(hash, progress.get(hash), moves);
         }
     }
 }
@@ -673,8 +654,6 @@ function loadConfiguration() {
         .then((response) => response.json())
         .then((json) => {
             configuration = json;
-            progress.path = `/${configuration["paths"]["progress"]}`;
-            puzzlesPath = `/${configuration["paths"]["gathered_puzzles"]}`;
             hardEvaluation =
                 !configuration["tactic_player"][
                     "count_moves_instead_of_puzzles"
@@ -684,21 +663,8 @@ function loadConfiguration() {
 }
 
 function loadPuzzles() {
-    fetch(puzzlesPath, { cache: "no-cache" })
-        .then((response) => response.json())
-        .then((json) => {
-            puzzles = json;
-            filterPuzzles();
-
-            for (let i = 0; i < puzzles.length; i++) {
-                const puzzle = puzzles[i];
-                hashes[puzzle.hash] = i;
-            }
-
-            puzzlesLoaded.resolve();
-            createPuzzleTable();
-            refreshPuzzleTable();
-        });
+    filterPuzzles();
+    puzzlesLoaded.resolve();
 }
 
 function getSolvedSymbol(value, moves) {
@@ -722,43 +688,68 @@ function gatherPuzzleTypes() {
     return puzzleTypes;
 }
 
+function getPuzzleQuery() {
+    const query = new URLSearchParams();
+    for (const puzzleType of gatherPuzzleTypes()) {
+        query.append("puzzle_type", puzzleType);
+    }
+
+    query.set("min_moves", $("#min_moves").val());
+    query.set("max_moves", $("#max_moves").val());
+    query.set("min_hardness", $("#min_hardness").val());
+    query.set("max_hardness", $("#max_hardness").val());
+    if (document.getElementById("unsolved").checked) {
+        query.set("solved", "false");
+    }
+
+    return query;
+}
+
 function filterPuzzles() {
-    if (puzzles === null) {
-        return undefined;
-    }
-
-    filteredPuzzles = [];
-
-    const puzzleTypes = gatherPuzzleTypes();
-    const onlyUnsolved = document.getElementById("unsolved").checked;
-    const minMoves = $("#min_moves").val();
-    const maxMoves = $("#max_moves").val();
-    const minHardness = parseFloat($("#min_hardness").val());
-    const maxHardness = parseFloat($("#max_hardness").val());
-
-    for (const puzzle of puzzles) {
-        const hardness = parseFloat(puzzle.hardness);
-        if (
-            puzzleTypes.includes(puzzle.puzzleType) &&
-            (!onlyUnsolved || !(puzzle.hash in progress.container)) &&
-            puzzle.moves >= minMoves &&
-            puzzle.moves <= maxMoves &&
-            hardness >= minHardness &&
-            hardness <= maxHardness
-        ) {
-            filteredPuzzles.push(puzzle);
-        }
+    puzzles = {};
+    nextPuzzle = null;
+    actionId += 1;
+    clearTable("games_list_table", 10);
+    loadPuzzlesPage(actionId);
+}
+
+function loadPuzzlesPage(currentActionId) {
+    const query = getPuzzleQuery();
+    if (nextPuzzle !== null) {
+        query.set("after", nextPuzzle);
     }
 
-    refreshPuzzleTable();
-    updateNumberOfPuzzles();
-    updateSolvedStates();
+    const firstPage = nextPuzzle === null;
+    loadingPuzzles = true;
+    fetch(`/puzzles?${query}`, { cache: "no-cache" })
+        .then((response) => response.json())
+        .then((page) => {
+            // a newer query was started meanwhile
+            if (currentActionId !== actionId) {
+                return;
+            }
+
+            if (firstPage) {
+                clearTable("games_list_table");
+            }
+
+            for (const puzzle of page.puzzles) {
+                puzzles[puzzle.hash] = puzzle;
+            }
+
+            nextPuzzle = page.next;
+            $("#more_puzzles").prop("hidden", nextPuzzle === null);
+            appendPuzzleRows(page.puzzles);
+            updateNumberOfPuzzles(page.total);
+        })
+        .finally(() => {
+            loadingPuzzles = false;
+        });
 }
 
-function createPuzzleTable() {
-    clearTable("games_list_table");
+function appendPuzzleRows(page) {
     const tableObject = document.getElementById("games_list_table");
-    for (const puzzle of puzzles) {
+    for (const puzzle of page) {
         const tr = document.createElement("tr");
         tr.id = `row${puzzle.hash}`;
 
@@ -787,28 +778,15 @@ function createPuzzleTable() {
         tableObject.appendChild(tr);
     }
 
+    updateSolvedStates();
     sorttable.makeSortable(document.getElementById("games"));
 }
 
-async function refreshPuzzleTable() {
-    if (puzzles === null || progress === null || hashes === null) {
-        return;
+$("#more_puzzles").on("click", function () {
+    if (!loadingPuzzles && nextPuzzle !== null) {
+        loadPuzzlesPage(actionId);
     }
-
-    actionId += 1;
-    const currentActionId = actionId;
-    for (const hash of Object.keys(hashes)) {
-        $(`#row${hash}`).hide();
-    }
-
-    for (const puzzle of filteredPuzzles) {
-        setTimeout(() => {
-            if (currentActionId === actionId) {
-                $(`#row${puzzle.hash}`).show();
-            }
-        }, 1);
-    }
-}
+});
 
 panelTextCallback = (text) => {
     setPanel($panel, text);
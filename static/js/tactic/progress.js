@@ -1,6 +1,5 @@
 export default class Progress {
     constructor(storage, afterLoad, afterSave) {
-        this.path = "";
         this.container = {};
 
         this.storage = storage;
@@ -8,14 +7,25 @@ export default class Progress {
         this.afterSave = afterSave;
     }
 
+    send(values) {
+        return $.ajax({
+            url: "/progress",
+            type: "POST",
+            data: JSON.stringify({ values: values }),
+            contentType: "application/json; charset=utf-8",
+        });
+    }
+
     clear() {
         this.container = {};
         this.storage.set("progress", this.container);
+        return $.ajax({ url: "/progress", type: "DELETE" });
     }
 
     update(data) {
         this.container = data;
         this.storage.set("progress", this.container);
+        return this.send(data);
     }
 
     get(key) {
@@ -30,13 +40,25 @@ export default class Progress {
     saveItem(key, value, moves) {
         if (!(key in this.container)) {
             this.set(key, value);
-            this.afterSave(key, value, moves);
+            this.send({ [key]: value }).always(() => {
+                this.afterSave(key, value, moves);
+            });
         }
     }
 
     load() {
-        this.container = this.storage.get("progress");
-        this.afterLoad();
+        // the progress of this browser is merged into the one of the server,
+        // which filters unsolved puzzles
+        const local = this.storage.get("progress") ?? {};
+        this.send(local).always(() => {
+            fetch("/progress", { cache: "no-cache" })
+                .then((response) => (response.ok ? response.json() : {}))
+                .then((json) => {
+                    this.container = { ...local, ...json };
+                    this.storage.set("progress", this.container);
+                    this.afterLoad();
+                });
+        });
     }
 
     link() {
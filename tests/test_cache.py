@@ -0,0 +1,64 @@
+from modules.engine import engine
+from modules.engine.cache import EvaluationCache, get_engine_signature
+from modules.engine.record import EngineRecord
+
+FEN = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+RESULT = [{"Move": "e7e5", "Centipawn": 30, "Mate": None}]
+
+
+def test_signature_depends_on_parameters(tmp_path):
+    path = str(tmp_path / "stockfish")
+    signature = get_engine_signature(path, 18, {"Skill Level": 20, "Threads": 1})
+
+    assert signature == get_engine_signature(path, 18, {"Threads": 1, "Skill Level": 20})
+    assert signature != get_engine_signature(path, 18, {"Skill Level": 5, "Threads": 1})
+
+
+def test_changed_parameters_invalidate_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EvaluationCache(get_engine_signature("stockfish", 18, {"Skill Level": 20}), path=path)
+    cache.put("top_moves", FEN, 18, 1, RESULT)
+    cache.close()
+
+    cache = EvaluationCache(get_engine_signature("stockfish", 18, {"Skill Level": 20}), path=path)
+    assert cache.get("top_moves", FEN, 18, 1) == RESULT
+    cache.close()
+
+    cache = EvaluationCache(get_engine_signature("stockfish", 18, {"Skill Level": 5}), path=path)
+    assert cache.get("top_moves", FEN, 18, 1) is None
+    assert cache.size == 0
+    cache.close()
+
+
+def test_hits_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EvaluationCache("signature", path=path, memory_entries=0)
+    cache.put("top_moves", FEN, 18, 1, RESULT)
+    assert cache.get("top_moves", FEN, 18, 1) == RESULT
+    assert not cache.connection.in_transaction
+    assert cache.accessed
+
+    tick = cache.accessed[cache.get_key("top_moves", FEN, 18, 1)]
+    cache.close()
+
+    cache = EvaluationCache("signature", path=path)
+    assert cache.connection.execute("SELECT accessed FROM evaluations").fetchone()[0] == tick
+    cache.close()
+
+
+def test_replaced_results_do_not_change_size(tmp_path):
+    cache = EvaluationCache("signature", path=str(tmp_path / "cache.sqlite"))
+    cache.put("top_moves", FEN, 18, 1, RESULT)
+    cache.put("top_moves", FEN, 18, 1, RESULT)
+
+    assert cache.size == cache.count() == 1
+    cache.close()
+
+
+def test_engine_signature_follows_depth(monkeypatch):
+    signatures = []
+    monkeypatch.setattr(engine, "EvaluationCache", lambda signature: signatures.append(signature))
+    for depth in [18, 12]:
+        engine.get_engine(depth, cache=True, record=EngineRecord(), replay=True)
+
+    assert signatures[0] != signatures[1]
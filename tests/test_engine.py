@@ -0,0 +1,43 @@
+import pytest
+
+from modules.engine.cache import EvaluationCache
+from modules.engine.engine import Engine
+from modules.engine.record import EngineRecord
+
+MISSING_PATH = "missing-stockfish"
+TOP_MOVES = [{"Move": "g1f3", "Centipawn": 35, "Mate": None}]
+
+
+def test_replay_does_not_start_engine_for_recorded_positions():
+    record = EngineRecord()
+    engine = Engine(path=MISSING_PATH, depth=18, record=record, replay=True)
+    engine.set_fen_position("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    engine.make_moves_from_current_position(["e2e4", "e7e5"])
+    fen = engine.get_fen_position()
+    record.put("top_moves", fen, engine.depth, 2, TOP_MOVES)
+
+    assert fen == "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2"
+    assert engine.get_top_moves(2) == TOP_MOVES
+    assert not engine.started
+    assert engine.searches == 0
+
+    with pytest.raises(ValueError):
+        engine.make_moves_from_current_position(["e1e3"])
+
+
+def test_replay_starts_engine_on_record_miss():
+    engine = Engine(path=MISSING_PATH, depth=18, record=EngineRecord(), replay=True)
+    engine.set_position(["d2d4"])
+
+    with pytest.raises(FileNotFoundError):
+        engine.get_top_moves(2)
+
+
+def test_replay_does_not_start_engine_for_cached_positions(tmp_path):
+    engine = Engine(path=MISSING_PATH, depth=18, record=EngineRecord(), replay=True)
+    engine.cache = EvaluationCache("signature", path=str(tmp_path / "cache.sqlite"))
+    engine.cache.put("top_moves", engine.get_fen_position(), engine.depth, 2, TOP_MOVES)
+
+    assert engine.get_top_moves(2) == TOP_MOVES
+    assert not engine.started
+    engine.close()
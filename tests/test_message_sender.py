@@ -0,0 +1,27 @@
+from modules.structures import message_sender
+from modules.structures.message import Message
+from modules.structures.message_sender import MessageSender
+
+
+class RecordingClient:
+    def __init__(self):
+        self.messages = []
+
+    def send(self, string: str):
+        if not string.startswith("metrics="):
+            self.messages.append(Message.decode(string))
+
+
+def test_throttled_status_is_coalesced_and_flushed(monkeypatch):
+    monkeypatch.setattr(message_sender, "STATUS_INTERVAL", 3600)
+    client = RecordingClient()
+    sender = MessageSender(client=client, id="batch", text="Analyzed", total=1)
+
+    for ply, move in enumerate(["1. e4", "1... e5", "2. Nf3"]):
+        sender(filename="game", fen=f"fen {ply}", move_string=move, turn=ply % 2 == 0, evaluation="0.30")
+
+    assert [message.last_move for message in client.messages] == ["1. e4"]
+
+    sender.flush()
+    sender.flush()
+    assert [message.last_move for message in client.messages] == ["1. e4", "2. Nf3"]
@@ -0,0 +1,30 @@
+import os
+
+from modules.finder.opening_trie import build_opening_trie
+from modules.pgn_index import get_pgn_index
+from modules.processor import Processor
+
+GAMES = [
+    '[Event "First"]\n[White "A"]\n[Black "B"]\n\n1. e4 e5 2. Nf3 Nc6 1-0\n',
+    '[Event "Second"]\n[White "C"]\n[Black "D"]\n\n1. e4 e5 2. Bc4 Bc5 0-1\n',
+    '[Event "Third"]\n[White "E"]\n[Black "F"]\n\n1. e4 e5 2. Nf3 Nf6 1/2-1/2\n',
+]
+
+
+def test_finished_games_are_not_shared(tmp_path):
+    path = str(tmp_path / "games.pgn")
+    with open(path, "w") as file:
+        file.write("\n".join(GAMES))
+
+    output_directory = tmp_path / "tactics"
+    finished = Processor.get_output_filename(get_pgn_index(path).read_game(0))
+    in_progress = Processor.get_output_filename(get_pgn_index(path).read_game(1))
+    os.makedirs(output_directory / finished)
+    os.makedirs(output_directory / in_progress)
+    (output_directory / in_progress / ".progress").touch()
+
+    trie = build_opening_trie([0, 1, 2], "", str(output_directory), path)
+
+    assert sorted(trie.games) == [1, 2]
+    assert [node.games for node in trie.get_path(1)] == [2, 2]
+    assert len(trie.get_path(2)) == 2
@@ -0,0 +1,60 @@
+import os
+
+import chess.pgn
+import pytest
+
+from modules.pgn_index import PgnIndex
+
+GAMES = [
+    '[Event "First"]\n[White "A"]\n[Black "B"]\n\n1. e4 e5 2. Nf3 Nc6 1-0\n',
+    '[Event "Second"]\n[White "C"]\n[Black "D"]\n\n1. d4 d5 { [%clk 0:03:00] } 0-1\n',
+    '[Event "Third"]\n[White "E"]\n[Black "F"]\n\n1. c4 e5 1/2-1/2\n',
+]
+
+
+def read_events(path: str) -> list[str]:
+    events = []
+    with open(path, encoding="utf-8-sig") as file:
+        while (game := chess.pgn.read_game(file)) is not None:
+            events.append(game.headers["Event"])
+
+    return events
+
+
+@pytest.mark.parametrize("bom", [b"", b"\xef\xbb\xbf"])
+def test_index_matches_python_chess(tmp_path, bom):
+    path = tmp_path / "games.pgn"
+    path.write_bytes(bom + "\n".join(GAMES).encode())
+    index = PgnIndex.build(str(path))
+
+    assert len(index) == len(read_events(str(path))) == 3
+    assert index.offsets[0] == 0
+    assert list(index.offsets) == sorted(index.offsets)
+    assert all(offset < index.size for offset in index.offsets)
+    assert [index.read_game(idx).headers["Event"] for idx in range(len(index))] == read_events(str(path))
+
+
+def test_shards_cover_all_games(tmp_path):
+    path = tmp_path / "games.pgn"
+    path.write_text("\n".join(GAMES * 3))
+    index = PgnIndex.build(str(path))
+
+    shards = [index.get_shard(shard, 4) for shard in range(1, 5)]
+    assert [idx for shard in shards for idx in shard] == list(range(len(index))) == list(range(9))
+
+
+def test_corrupted_or_stale_index_is_rebuilt(tmp_path):
+    path = tmp_path / "games.pgn"
+    path.write_text("\n".join(GAMES))
+    index_path = tmp_path / "games.pgn.idx"
+    assert len(PgnIndex.load(str(path))) == 3
+
+    index_path.write_bytes(index_path.read_bytes()[:10])
+    assert len(PgnIndex.load(str(path))) == 3
+
+    stat = path.stat()
+    path.write_text("\n".join(reversed(GAMES)))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    index = PgnIndex.load(str(path))
+    assert index.digest == PgnIndex.build(str(path)).digest
+    assert index.read_game(0).headers["Event"] == "Third"
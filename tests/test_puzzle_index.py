@@ -0,0 +1,64 @@
+import os
+
+from modules.server.manifest import Manifest
+from modules.server.progress_store import ProgressStore
+from modules.server.puzzle_index import PuzzleFilters, PuzzleIndex
+
+
+def get_puzzle(path: str) -> dict:
+    with open(path) as file:
+        puzzle_hash, moves = file.read().split()
+
+    return {
+        "hash": puzzle_hash,
+        "puzzleType": "material",
+        "hardness": 1.0,
+        "moves": int(moves),
+        "white": "A",
+        "black": "B",
+        "whiteElo": "1500",
+        "blackElo": "1600",
+        "whiteToMove": True,
+        "date": "2020.01.01",
+        "pgn": "",
+    }
+
+
+def write_puzzles(directory, puzzles: dict[str, str]) -> list[str]:
+    paths = []
+    for name, content in puzzles.items():
+        path = os.path.join(directory, name)
+        with open(path, "w") as file:
+            file.write(content)
+
+        paths.append(path)
+
+    return paths
+
+
+def test_manifest_updates_changed_and_removed_puzzles(tmp_path):
+    progress = ProgressStore(str(tmp_path / "progress.sqlite"))
+    index = PuzzleIndex(str(tmp_path / "puzzles.sqlite"), str(tmp_path / "progress.sqlite"))
+    manifest = Manifest({})
+
+    paths = write_puzzles(tmp_path, {"a": "aaa 2", "b": "bbb 3", "c": "ccc 1"})
+    puzzles, changed, removed = manifest.update("puzzles", paths, get_puzzle)
+    assert len(changed) == 3 and not removed
+    index.replace(puzzles)
+
+    os.remove(paths[2])
+    paths = write_puzzles(tmp_path, {"a": "aaa 2", "b": "ddd 4"})
+    os.utime(paths[1], ns=(0, 0))
+    puzzles, changed, removed = manifest.update("puzzles", paths, get_puzzle)
+    assert [puzzle["hash"] for puzzle in changed] == ["ddd"]
+    assert sorted(puzzle["hash"] for puzzle in removed) == ["bbb", "ccc"]
+
+    index.update(changed, [puzzle["hash"] for puzzle in removed])
+    assert index.query(PuzzleFilters())["puzzles"] == [
+        {key: value for key, value in puzzle.items() if key != "pgn"} for puzzle in puzzles
+    ]
+
+    progress.update({"aaa": 2, "ddd": 1, "eee": 5}, lambda _: None)
+    assert [puzzle["hash"] for puzzle in index.query(PuzzleFilters(solved=True))["puzzles"]] == ["aaa", "ddd"]
+    assert index.query(PuzzleFilters(solved=False))["total"] == 0
+    assert index.get_statistics() == {"puzzles": 2, "solved": 2, "correct": 1, "moves": 6, "correctMoves": 3}
@@ -0,0 +1,11 @@
+from chess.pgn import Headers
+
+from modules.structures.review import CHART_PLY_HEIGHT, Review
+
+
+def test_chart_of_review_without_moves():
+    for review in [Review(headers=Headers()), Review(headers=Headers(), moves=[])]:
+        chart = review.plot_evaluations()
+
+        assert chart.startswith("<svg")
+        assert f'height="{CHART_PLY_HEIGHT}"' in chart
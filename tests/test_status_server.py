@@ -0,0 +1,35 @@
+from modules.server import status_server
+from modules.server.connection import JOB_ID_VARIABLE, encode_job_id, get_job_id
+from modules.singleton import Singleton
+from modules.structures.message import Message
+
+
+class FakeConnection:
+    def __init__(self, messages: list[str]):
+        self.messages = messages
+
+    def recv(self) -> str:
+        if not self.messages:
+            raise EOFError
+
+        return self.messages.pop(0)
+
+    def close(self):
+        pass
+
+
+def test_jobs_are_keyed_by_scheduler_ids(monkeypatch):
+    monkeypatch.setattr(Singleton, "_instances", {})
+    monkeypatch.setattr(status_server, "get_listener", lambda: None)
+    server = status_server.StatusServer()
+    server._running.set()
+
+    monkeypatch.setenv(JOB_ID_VARIABLE, "7")
+    server.communicate(FakeConnection([encode_job_id(get_job_id()), Message("Analyzed 1/2", 1, 2).encode()]))
+    server.communicate(FakeConnection([Message("Reviewed 1/2", 1, 2).encode()]))
+    server.communicate(FakeConnection([encode_job_id("7"), Message("Analysis completed.", 2, 2).encode()]))
+
+    jobs = {job["id"]: job for job in server.get_jobs()}
+    assert sorted(jobs) == ["7", "script-1"]
+    assert jobs["7"]["state"] == "completed"
+    assert jobs["script-1"]["state"] == "interrupted"
@@ -0,0 +1,71 @@
+from chess.pgn import Headers
+
+from modules.engine.engine import Engine
+from modules.engine.record import EngineRecord
+from modules.finder import parallel
+from modules.finder.tactic_finder import TacticFinder
+from modules.structures.position import Position
+
+MISSING_PATH = "missing-stockfish"
+DEPTH = 18
+TOP_MOVES = 5
+
+# black leaves the queen to the rook, which a search at depth 8 misses in this record
+FEN = "k7/8/8/8/3q4/8/8/K2R4 b - - 0 1"
+MOVE = "d4d5"
+RECORD = {
+    ("k7/8/8/3q4/8/8/8/K2R4 w - - 1 2", 8): [("d1d5", 0), ("a1b1", -20)],
+    ("k7/8/8/3q4/8/8/8/K2R4 w - - 1 2", DEPTH): [("d1d5", 800), ("a1b1", -800)],
+    ("k7/8/8/3R4/8/8/8/K7 b - - 0 2", DEPTH): [("a8b7", 800)],
+    ("8/1k6/8/3R4/8/8/8/K7 w - - 1 3", 8): [("d5d1", 900), ("d5d2", 880)],
+    ("8/1k6/8/3R4/8/8/8/K7 w - - 1 3", DEPTH): [("d5d1", 900), ("d5d2", 880)],
+}
+
+
+def get_top_moves(moves: list[tuple[str, int]]) -> list[dict]:
+    return [{"Move": move, "Centipawn": centipawns, "Mate": None} for move, centipawns in moves]
+
+
+def get_recorded_engine() -> Engine:
+    record = EngineRecord()
+    for (fen, depth), moves in RECORD.items():
+        record.put("top_moves", fen, depth, TOP_MOVES, get_top_moves(moves))
+
+    return Engine(path=MISSING_PATH, depth=DEPTH, record=record, replay=True)
+
+
+def search(monkeypatch, deepening_depths: list[int]):
+    monkeypatch.setattr(parallel, "stockfish", get_recorded_engine())
+    monkeypatch.setattr(parallel, "reported", len(RECORD))
+    return parallel.search_ply(0, FEN, MOVE, False, Headers(), deepening_depths=deepening_depths)
+
+
+def test_deepening_finds_the_same_tactics(monkeypatch):
+    without = search(monkeypatch, [])
+    with_deepening = search(monkeypatch, [8])
+
+    assert without.tactic is not None
+    assert [position.move for position in with_deepening.tactic.positions] == [
+        position.move for position in without.tactic.positions
+    ]
+    assert with_deepening.evaluation == without.evaluation
+    assert with_deepening.early_rejections == 1
+
+
+def test_early_rejected_positions_are_marked_shallow(monkeypatch):
+    without = search(monkeypatch, [])
+    with_deepening = search(monkeypatch, [8])
+
+    assert not any(position.shallow for position in without.tactic.positions)
+    assert [position.shallow for position in with_deepening.tactic.positions] == [False, False, True]
+
+
+def test_positions_just_inside_the_threshold_are_not_rejected():
+    position = Position(move=MOVE, color=False, evaluation=None, fen=FEN)
+    tactic_finder = TacticFinder(get_recorded_engine(), True, position, deepening_depths=[8])
+    threshold = round(tactic_finder.pawn_threshold * 100)
+    margin = round(tactic_finder.deepening_pawn_margin * 100)
+
+    assert not tactic_finder.is_clearly_rejected(get_top_moves([("d1d5", threshold - 1), ("a1b1", 0)]))
+    assert not tactic_finder.is_clearly_rejected(get_top_moves([("d1d5", threshold - margin), ("a1b1", 0)]))
+    assert tactic_finder.is_clearly_rejected(get_top_moves([("d1d5", threshold - margin - 1), ("a1b1", 0)]))